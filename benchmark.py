@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark of the review pipeline on synthetic ROS2 workspaces.
+
+Generates ROS2-style trees (packages with Python nodes, C++ sources and headers, launch
+files, parameters, vendored copies of shared helpers and a few huge generated headers),
+runs the full ``CodeReviewer.run`` graph against an in-process ``MockLLMServer`` and
+records wall time and peak traced memory for every graph node, plus the cumulative
+time spent in chunking, prompt building and ledger writes::
+
+    python benchmark.py --sizes 1000 10000 100000 --output benchmark-results.json
+    python benchmark.py --sizes 1000 --compare benchmark-results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from mock_server import MockLLMServer, MockServerConfig
+from reviewer import CodeReviewer
+
+RESULTS_VERSION = 1
+FILES_PER_PACKAGE = 20
+DEFAULT_EXCLUDES = ['*.pyc', '*.pyo', '__pycache__/*', '.svn/*', '.git/*', 'build/*', 'install/*', 'log/*']
+GRAPH_NODES = [
+    ('collect_files', '_collect_files_node'),
+    ('dedupe_files', '_dedupe_files_node'),
+    ('build_overview', '_build_overview_node'),
+    ('create_batches', '_create_batches_node'),
+    ('review_batches', '_review_batches_node'),
+    ('fan_out_duplicates', '_fan_out_duplicates_node'),
+    ('finalize', '_finalize_node'),
+]
+# Hot paths called from inside the nodes, timed cumulatively across worker threads.
+OPERATIONS = [
+    ('generate_chunks', None, 'split_file_content'),
+    ('build_file_prompt', None, 'generate_review_prompt'),
+    ('repo_overview_context', None, 'get_repo_overview_context'),
+    ('ledger_append', 'coverage', 'append_record'),
+    ('coverage_report', 'coverage', 'build_report'),
+]
+
+_VENDORED_HELPER = '''"""Message conversion helpers vendored into every package."""
+
+import math
+
+
+def quaternion_to_yaw(x, y, z, w):
+    siny_cosp = 2.0 * (w * z + x * y)
+    cosy_cosp = 1.0 - 2.0 * (y * y + z * z)
+    return math.atan2(siny_cosp, cosy_cosp)
+
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+'''
+
+
+def _python_node(rng: random.Random, package: str, name: str) -> str:
+    lines = [
+        'import rclpy',
+        'from rclpy.node import Node',
+        'from std_msgs.msg import String',
+        '',
+        '',
+        f'class {name.title().replace("_", "")}(Node):',
+        '    def __init__(self):',
+        f"        super().__init__('{name}')",
+        f"        self.publisher = self.create_publisher(String, '{package}/{name}', 10)",
+        '        self.timer = self.create_timer(0.5, self.on_timer)',
+        '        self.count = 0',
+        '',
+    ]
+    for idx in range(rng.randint(2, 12)):
+        lines += [
+            f'    def handle_{idx}(self, msg):',
+            f'        value = len(msg.data) * {idx + 1}',
+            '        if value > self.count:',
+            '            self.count = value',
+            f"        self.get_logger().info(f'handled {idx}: {{value}}')",
+            '        return value',
+            '',
+        ]
+    lines += [
+        '    def on_timer(self):',
+        '        msg = String()',
+        "        msg.data = f'tick {self.count}'",
+        '        self.publisher.publish(msg)',
+        '',
+        '',
+        'def main(args=None):',
+        '    rclpy.init(args=args)',
+        f'    rclpy.spin({name.title().replace("_", "")}())',
+        '    rclpy.shutdown()',
+        '',
+    ]
+    return '\n'.join(lines)
+
+
+def _cpp_source(rng: random.Random, package: str, name: str) -> str:
+    lines = [
+        f'#include "{package}/{name}.hpp"',
+        '',
+        '#include <chrono>',
+        '#include <memory>',
+        '',
+        f'namespace {package}',
+        '{',
+        '',
+        f'{name.title().replace("_", "")}::{name.title().replace("_", "")}()',
+        f': rclcpp::Node("{name}")',
+        '{',
+        '  publisher_ = create_publisher<std_msgs::msg::String>("out", 10);',
+        '}',
+        '',
+    ]
+    for idx in range(rng.randint(2, 15)):
+        lines += [
+            f'int {name.title().replace("_", "")}::compute_{idx}(const std::vector<int> & values)',
+            '{',
+            '  int total = 0;',
+            '  for (size_t i = 0; i <= values.size(); ++i) {',
+            f'    total += values[i] * {idx + 1};',
+            '  }',
+            '  return total;',
+            '}',
+            '',
+        ]
+    lines += [f'}}  // namespace {package}', '']
+    return '\n'.join(lines)
+
+
+def _cpp_header(rng: random.Random, package: str, name: str) -> str:
+    class_name = name.title().replace('_', '')
+    lines = [
+        '#pragma once',
+        '',
+        '#include <rclcpp/rclcpp.hpp>',
+        '#include <std_msgs/msg/string.hpp>',
+        '',
+        f'namespace {package}',
+        '{',
+        f'class {class_name} : public rclcpp::Node',
+        '{',
+        'public:',
+        f'  {class_name}();',
+    ]
+    lines += [f'  int compute_{idx}(const std::vector<int> & values);' for idx in range(rng.randint(2, 15))]
+    lines += [
+        '',
+        'private:',
+        '  rclcpp::Publisher<std_msgs::msg::String>::SharedPtr publisher_;',
+        '};',
+        f'}}  // namespace {package}',
+        '',
+    ]
+    return '\n'.join(lines)
+
+
+def _generated_header(rng: random.Random, package: str, line_count: int) -> str:
+    lines = ['// Auto-generated message type support. Do not edit.', '#pragma once', '']
+    idx = 0
+    while len(lines) < line_count:
+        lines += [
+            f'struct {package.title()}Field{idx} {{',
+            f'  static constexpr uint32_t id = {rng.randint(0, 1 << 30)}u;',
+            '  double value;',
+            '};',
+        ]
+        idx += 1
+    return '\n'.join(lines[:line_count]) + '\n'
+
+
+def _launch_file(package: str, nodes: List[str]) -> str:
+    body = '\n'.join(f'  <node pkg="{package}" exec="{node}" name="{node}" output="screen"/>' for node in nodes)
+    return f'<launch>\n{body}\n</launch>\n'
+
+
+def _params_file(rng: random.Random, nodes: List[str]) -> str:
+    lines = []
+    for node in nodes:
+        lines += [f'{node}:', '  ros__parameters:']
+        lines += [f'    param_{idx}: {rng.random():.4f}' for idx in range(rng.randint(2, 10))]
+    return '\n'.join(lines) + '\n'
+
+
+def generate_workspace(
+    root: Path,
+    file_count: int,
+    seed: int = 0,
+    huge_ratio: float = 0.001,
+    huge_lines: int = 30000,
+    vendored_ratio: float = 0.05,
+) -> Dict[str, Any]:
+    """Write a synthetic ROS2 workspace with about ``file_count`` reviewable files under ``root``."""
+
+    rng = random.Random(seed)
+    files: Dict[str, str] = {}
+    huge_files = max(1, int(file_count * huge_ratio)) if huge_ratio > 0 else 0
+    for pkg_idx in range(math.ceil(file_count / FILES_PER_PACKAGE)):
+        package = f'pkg_{pkg_idx:05d}'
+        base = f'src/{package}'
+        nodes = [f'node_{idx}' for idx in range(rng.randint(2, 5))]
+        package_files: Dict[str, str] = {}
+        package_files[f'{base}/package.xml'] = (
+            f'<?xml version="1.0"?>\n<package format="3">\n  <name>{package}</name>\n'
+            '  <version>0.1.0</version>\n  <depend>rclcpp</depend>\n  <depend>rclpy</depend>\n</package>\n'
+        )
+        package_files[f'{base}/launch/{package}.launch'] = _launch_file(package, nodes)
+        package_files[f'{base}/config/params.yaml'] = _params_file(rng, nodes)
+        # The same helper copied into packages, as vendored message utilities are in practice.
+        if rng.random() < vendored_ratio * FILES_PER_PACKAGE:
+            package_files[f'{base}/{package}/vendor/msg_utils.py'] = _VENDORED_HELPER
+        while len(package_files) < FILES_PER_PACKAGE:
+            name = f'node_{rng.randrange(10_000)}'
+            kind = rng.random()
+            if kind < 0.45:
+                package_files[f'{base}/{package}/{name}.py'] = _python_node(rng, package, name)
+            elif kind < 0.75:
+                package_files[f'{base}/src/{name}.cpp'] = _cpp_source(rng, package, name)
+            else:
+                package_files[f'{base}/include/{package}/{name}.hpp'] = _cpp_header(rng, package, name)
+        files.update(package_files)
+        if len(files) >= file_count:
+            break
+
+    paths = sorted(files)[:file_count]
+    for idx in range(huge_files):
+        package = paths[rng.randrange(len(paths))].split('/')[1]
+        path = f'src/{package}/include/{package}/generated/msg_types_{idx}.hpp'
+        files[path] = _generated_header(rng, package, huge_lines)
+        paths[-(idx + 1)] = path
+
+    total_bytes = 0
+    for path in paths:
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        data = files[path].encode('utf-8')
+        target.write_bytes(data)
+        total_bytes += len(data)
+    return {'files': len(paths), 'bytes': total_bytes, 'huge_files': huge_files}
+
+
+class _StageRecorder:
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.operations: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            if self.trace_memory:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry: Dict[str, float] = {'seconds': round(time.perf_counter() - started, 4)}
+                if self.trace_memory:
+                    current, peak = tracemalloc.get_traced_memory()
+                    entry['peak_mb'] = round(peak / 2**20, 2)
+                    entry['retained_mb'] = round((current - before) / 2**20, 2)
+                self.stages[name] = entry
+
+        return timed
+
+    def operation(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    entry = self.operations.setdefault(name, {'calls': 0, 'seconds': 0.0})
+                    entry['calls'] += 1
+                    entry['seconds'] += elapsed
+
+        return timed
+
+    def instrument(self, reviewer: CodeReviewer) -> None:
+        for stage, method in GRAPH_NODES:
+            setattr(reviewer, method, self.stage(stage, getattr(reviewer, method)))
+        for name, owner_attr, method in OPERATIONS:
+            owner = getattr(reviewer, owner_attr) if owner_attr else reviewer
+            setattr(owner, method, self.operation(name, getattr(owner, method)))
+
+
+def check_finding_lines(code_dir: Path, output_path: Path) -> int:
+    """Raise if a finding points past the end of its file; return the number of findings."""
+
+    results = json.loads(output_path.read_text(encoding='utf-8'))['results']
+    checked = 0
+    for result in results:
+        line_count = max(1, len((code_dir / result['file']).read_text(encoding='utf-8').splitlines()))
+        for review in result['reviews']:
+            line = review.get('line')
+            if isinstance(line, int) and not 1 <= line <= line_count:
+                raise AssertionError(
+                    f"{result['file']}: 指摘の行番号 {line} がファイルの行数 {line_count} を超えています"
+                )
+            checked += 1
+    return checked
+
+
+def run_workspace(code_dir: Path, server: MockLLMServer, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the full review graph on ``code_dir`` and return per-stage measurements."""
+
+    recorder = _StageRecorder(trace_memory=not args.no_memory)
+    if recorder.trace_memory:
+        tracemalloc.start()
+    requests_before = server.stats()['requests']
+    started = time.perf_counter()
+    try:
+        init = recorder.stage('init', lambda: CodeReviewer(
+            api_url=server.url,
+            model='mock-model',
+            context_length=args.context_length,
+            output_path=str(code_dir / 'review-results.json'),
+            exclude_patterns=list(DEFAULT_EXCLUDES),
+            code_dir=str(code_dir),
+            review_focus=['bugs', 'performance', 'maintainability'],
+            language='ja',
+            concurrency=args.concurrency,
+            use_cache=False,
+            stream=args.stream,
+            repo_overview_tokens=args.repo_overview_tokens,
+        ))
+        reviewer = init()
+        recorder.instrument(reviewer)
+        # Per-batch progress lines would dominate the measurement on large trees.
+        with contextlib.redirect_stdout(io.StringIO()):
+            reviewer.run()
+    finally:
+        total_seconds = time.perf_counter() - started
+        if recorder.trace_memory:
+            _, overall_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    result: Dict[str, Any] = {
+        'total_seconds': round(total_seconds, 3),
+        'llm_requests': server.stats()['requests'] - requests_before,
+        'stages': recorder.stages,
+        'operations': {
+            name: {'calls': int(entry['calls']), 'seconds': round(entry['seconds'], 4)}
+            for name, entry in sorted(recorder.operations.items())
+        },
+    }
+    if recorder.trace_memory:
+        result['peak_mb'] = round(overall_peak / 2**20, 2)
+    report = json.loads((code_dir / 'coverage' / 'report.json').read_text(encoding='utf-8'))
+    result['segments'] = report['total_segments']
+    result['covered_segments'] = report['covered_segments']
+    result['findings'] = check_finding_lines(code_dir, code_dir / 'review-results.json')
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print per-stage time and memory changes against a previous results file."""
+
+    previous = {entry['requested_files']: entry for entry in baseline.get('workspaces', [])}
+    for entry in results['workspaces']:
+        old = previous.get(entry['requested_files'])
+        if old is None:
+            print(f"\n{entry['requested_files']} ファイル: 比較対象なし")
+            continue
+        print(f"\n{entry['requested_files']} ファイル (基準: {baseline.get('commit') or '不明'})")
+        print(f"  {'stage':<20} {'time':>10} {'base':>10} {'change':>8} {'peak MB':>9} {'base':>9}")
+        for stage, now in entry['stages'].items():
+            before = old.get('stages', {}).get(stage)
+            if before is None:
+                continue
+            change = (now['seconds'] / before['seconds'] - 1) if before['seconds'] else 0.0
+            print(
+                f"  {stage:<20} {now['seconds']:>9.3f}s {before['seconds']:>9.3f}s {change:>+8.1%} "
+                f"{now.get('peak_mb', float('nan')):>9.1f} {before.get('peak_mb', float('nan')):>9.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='合成ROS2ワークスペースでレビュー処理全体の性能を計測するベンチマーク')
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+        help='生成するワークスペースのファイル数 (デフォルト: 1000 10000 100000)'
+    )
+    parser.add_argument('--output', default='benchmark-results.json', help='結果のJSONファイル (デフォルト: benchmark-results.json)')
+    parser.add_argument('--compare', help='比較する過去の結果JSONファイル')
+    parser.add_argument('--workdir', help='ワークスペースを生成するディレクトリ（デフォルト: 一時ディレクトリ）')
+    parser.add_argument('--keep', action='store_true', help='生成したワークスペースを削除せずに残す')
+    parser.add_argument('--seed', type=int, default=0, help='ワークスペース生成の乱数シード (デフォルト: 0)')
+    parser.add_argument('--huge-ratio', type=float, default=0.001, help='巨大な生成ヘッダーの割合 (デフォルト: 0.001)')
+    parser.add_argument('--huge-lines', type=int, default=30000, help='巨大な生成ヘッダーの行数 (デフォルト: 30000)')
+    parser.add_argument('--concurrency', type=int, default=8, help='レビューの並列数 (デフォルト: 8)')
+    parser.add_argument('--context-length', type=int, default=32768, help='モデルのコンテキスト長 (デフォルト: 32768)')
+    parser.add_argument('--repo-overview-tokens', type=int, default=0, help='リポジトリ概要に使うトークン数 (デフォルト: 0)')
+    parser.add_argument('--stream', action='store_true', help='ストリーミング応答で計測する')
+    parser.add_argument('--latency', default='0', help='モックLLMサーバーの遅延分布 (デフォルト: 0)')
+    parser.add_argument('--no-memory', action='store_true', help='tracemalloc を使わず時間だけを計測する（計測のオーバーヘッドを除く）')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='reviewer-bench-'))
+    results: Dict[str, Any] = {
+        'version': RESULTS_VERSION,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {
+            'concurrency': args.concurrency,
+            'context_length': args.context_length,
+            'repo_overview_tokens': args.repo_overview_tokens,
+            'stream': args.stream,
+            'latency': args.latency,
+            'seed': args.seed,
+            'huge_ratio': args.huge_ratio,
+            'huge_lines': args.huge_lines,
+            'memory_traced': not args.no_memory,
+        },
+        'workspaces': [],
+    }
+
+    with MockLLMServer(MockServerConfig(latency=args.latency, seed=args.seed)) as server:
+        for size in args.sizes:
+            code_dir = workdir / f'ws_{size}'
+            if code_dir.exists():
+                shutil.rmtree(code_dir)
+            print(f"{size} ファイルのワークスペースを生成中: {code_dir}")
+            started = time.perf_counter()
+            generated = generate_workspace(
+                code_dir, size, seed=args.seed, huge_ratio=args.huge_ratio, huge_lines=args.huge_lines
+            )
+            generate_seconds = time.perf_counter() - started
+            print(f"  レビューを実行中 ({generated['files']} ファイル, {generated['bytes'] / 2**20:.1f} MB)")
+            measured = run_workspace(code_dir, server, args)
+            entry = {
+                'requested_files': size,
+                **generated,
+                'generate_seconds': round(generate_seconds, 3),
+                **measured,
+            }
+            results['workspaces'].append(entry)
+            for stage, stats in entry['stages'].items():
+                memory = f", ピーク {stats['peak_mb']:.1f} MB" if 'peak_mb' in stats else ''
+                print(f"  {stage:<20} {stats['seconds']:>9.3f}秒{memory}")
+            print(f"  合計 {entry['total_seconds']:.1f}秒, LLMリクエスト {entry['llm_requests']} 件")
+            if not args.keep:
+                shutil.rmtree(code_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, indent=2, ensure_ascii=False)
+    print(f"結果を保存しました: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as handle:
+            compare(results, json.load(handle))
+    if not args.keep and not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,11 +18,10 @@ class Chunk:
     sha256: str
 
 
-def _calculate_chunk_size(context_length: int, max_lines: int) -> int:
+def _calculate_chunk_size(context_length: int, max_lines: int, tokens_per_line: float) -> int:
     # Use at most 30% of the available context for content and keep the chunk size stable.
     token_budget = max(1, int(context_length * 0.3))
-    # Assume a conservative 5 tokens per line to avoid overshooting.
-    estimated_lines = max(50, token_budget // 5)
+    estimated_lines = max(50, int(token_budget // max(0.5, tokens_per_line)))
     return max(1, min(max_lines, estimated_lines))
 
 
@@ -34,8 +33,13 @@ def generate_chunks(
     context_length: int,
     max_lines: int = 1000,
     overlap_ratio: float = 0.05,
+    tokens_per_line: float = 5.0,
 ) -> List[Chunk]:
-    """Split a file into deterministic, overlapping line-based chunks."""
+    """Split a file into deterministic, overlapping line-based chunks.
+
+    ``tokens_per_line`` defaults to a conservative 5; callers with a calibrated estimate
+    for the file pass that instead.
+    """
 
     lines = content.splitlines()
     total_lines = len(lines)
@@ -52,7 +56,7 @@ def generate_chunks(
             )
         ]
 
-    chunk_size = _calculate_chunk_size(context_length, max_lines)
+    chunk_size = _calculate_chunk_size(context_length, max_lines, tokens_per_line)
     overlap = max(0, int(round(chunk_size * overlap_ratio)))
     file_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
 
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import json
 import hashlib
+import threading
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 
 @dataclass
@@ -33,6 +34,16 @@ class LedgerRecord:
     status: str
     error_message: Optional[str]
     ts: str
+    cache: Optional[str] = None
+    timing: Optional[Dict[str, float]] = None
+    continuations: int = 0
+    attempts: int = 1
+    backoff_s: float = 0.0
+    structured_output: bool = False
+    recovered: bool = False
+    hedged: bool = False
+    duplicate_of: Optional[str] = None
+    missing_files: Optional[List[Dict[str, object]]] = None
 
 
 @dataclass
@@ -47,6 +58,9 @@ class CoverageLedger:
     covered: Set[str] = field(default_factory=set)
     records: List[LedgerRecord] = field(default_factory=list)
     reasons: Dict[str, str] = field(default_factory=dict)
+    duplicate_sources: Dict[str, str] = field(default_factory=dict)
+    superseded: Set[str] = field(default_factory=set)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
 
     def __post_init__(self) -> None:
         self.coverage_dir = self.code_dir / "coverage"
@@ -85,14 +99,29 @@ class CoverageLedger:
                     status=data.get("status", "error"),
                     error_message=data.get("error_message"),
                     ts=data.get("ts", ""),
+                    cache=data.get("cache"),
+                    timing=data.get("timing"),
+                    continuations=data.get("continuations", 0),
+                    attempts=data.get("attempts", 1),
+                    backoff_s=data.get("backoff_s", 0.0),
+                    structured_output=data.get("structured_output", False),
+                    recovered=data.get("recovered", False),
+                    hedged=data.get("hedged", False),
+                    duplicate_of=data.get("duplicate_of"),
+                    missing_files=data.get("missing_files"),
                 )
                 self.records.append(record)
+                self.covered.update(self._covered_keys(record))
 
-                if record.status == "ok":
-                    for file_entry in record.files:
-                        key = self._target_key_from_entry(file_entry)
-                        if key:
-                            self.covered.add(key)
+    def _covered_keys(self, record: LedgerRecord) -> Set[str]:
+        """Segments an ``ok`` record covers: every file sent except those the answer left out."""
+
+        if record.status != "ok":
+            return set()
+        keys = {self._target_key_from_entry(entry) for entry in record.files}
+        keys -= {self._target_key_from_entry(entry) for entry in record.missing_files or []}
+        keys.discard(None)
+        return keys
 
     def _target_key_from_entry(self, entry: Dict[str, object]) -> Optional[str]:
         path = entry.get("path")
@@ -109,10 +138,11 @@ class CoverageLedger:
         return f"{path}:{start}:{end}:{sha}:{chunk_id}"
 
     def register_targets(self, targets: Iterable[CoverageTarget]) -> None:
-        for target in targets:
-            self.targets[target.key()] = target
-            if target.reason:
-                self.reasons[target.key()] = target.reason
+        with self._lock:
+            for target in targets:
+                self.targets[target.key()] = target
+                if target.reason:
+                    self.reasons[target.key()] = target.reason
 
     def record_skip(self, path: str, reason: str) -> None:
         """Register a skipped path so coverage reports can surface the reason."""
@@ -128,9 +158,75 @@ class CoverageLedger:
             chunk_id=chunk_id,
             reason=reason_text,
         )
-        if target.key() not in self.targets:
-            self.targets[target.key()] = target
-            self.reasons[target.key()] = reason_text
+        with self._lock:
+            if target.key() not in self.targets:
+                self.targets[target.key()] = target
+                self.reasons[target.key()] = reason_text
+
+    def mark_unreviewed(self, files: List[Dict[str, object]], reason: str) -> None:
+        """Attach a reason to registered segments that were deliberately left unreviewed."""
+
+        with self._lock:
+            for file_entry in files:
+                key = self._target_key_from_entry(file_entry)
+                if key and key not in self.covered:
+                    self.reasons[key] = reason
+
+    def supersede(self, files: List[Dict[str, object]]) -> None:
+        """Drop failed targets that were split into smaller replacement targets."""
+
+        with self._lock:
+            for file_entry in files:
+                key = self._target_key_from_entry(file_entry)
+                if key and key in self.targets and key not in self.covered:
+                    del self.targets[key]
+                    self.reasons.pop(key, None)
+                    self.superseded.add(key)
+
+    def mirror_targets(
+        self, duplicates: Dict[str, List[str]]
+    ) -> Dict[str, Dict[str, List[Dict[str, object]]]]:
+        """Register each duplicate with the same segments as its identical representative.
+
+        ``duplicates`` maps representative paths to their copies. Returns, per representative
+        and duplicate, ledger entries for the mirrored segments whose source segment is
+        covered; the others inherit the source's reason for being unreviewed.
+        """
+
+        mirrored_entries: Dict[str, Dict[str, List[Dict[str, object]]]] = {
+            source: {duplicate: [] for duplicate in copies} for source, copies in duplicates.items()
+        }
+        with self._lock:
+            # One pass over the targets, instead of one per duplicate group.
+            sources: Dict[str, List[Tuple[str, CoverageTarget]]] = {}
+            for key, target in self.targets.items():
+                if target.path in duplicates:
+                    sources.setdefault(target.path, []).append((key, target))
+            for source, copies in duplicates.items():
+                for duplicate in copies:
+                    for key, target in sources.get(source, []):
+                        mirrored = CoverageTarget(
+                            path=duplicate,
+                            sha256=target.sha256,
+                            start_line=target.start_line,
+                            end_line=target.end_line,
+                            chunk_id=duplicate + target.chunk_id[len(source):],
+                            reason=target.reason,
+                        )
+                        self.targets[mirrored.key()] = mirrored
+                        if key in self.covered:
+                            mirrored_entries[source][duplicate].append({
+                                "path": mirrored.path,
+                                "sha256": mirrored.sha256,
+                                "start_line": mirrored.start_line,
+                                "end_line": mirrored.end_line,
+                                "chunk_id": mirrored.chunk_id,
+                            })
+                        else:
+                            # The reason stays as-is so it can still be matched, e.g. time_budget.
+                            self.reasons[mirrored.key()] = self.reasons.get(key) or "not reviewed"
+                            self.duplicate_sources[mirrored.key()] = source
+        return mirrored_entries
 
     def append_record(
         self,
@@ -144,7 +240,31 @@ class CoverageLedger:
         completion_tokens: int,
         status: str,
         error_message: Optional[str] = None,
+        cache: Optional[str] = None,
+        timing: Optional[Dict[str, float]] = None,
+        continuations: int = 0,
+        attempts: int = 1,
+        backoff_s: float = 0.0,
+        usage: Optional[Dict[str, int]] = None,
+        structured_output: bool = False,
+        recovered: bool = False,
+        hedged: bool = False,
+        duplicate_of: Optional[str] = None,
+        missing_files: Optional[List[Dict[str, object]]] = None,
     ) -> None:
+        tokens = {
+            "prompt_est": prompt_tokens,
+            "completion_est": completion_tokens,
+        }
+        if usage:
+            # Server-reported counts, summed over continuation requests.
+            for key, name in (
+                ("prompt_tokens", "prompt"),
+                ("completion_tokens", "completion"),
+                ("cached_tokens", "prompt_cached"),
+            ):
+                if key in usage:
+                    tokens[name] = usage[key]
         record = LedgerRecord(
             commit=self.commit_sha,
             files=files,
@@ -152,25 +272,30 @@ class CoverageLedger:
             api_url=api_url,
             max_context=max_context,
             prompt_hash=prompt_hash,
-            tokens={
-                "prompt_est": prompt_tokens,
-                "completion_est": completion_tokens,
-            },
+            tokens=tokens,
             status=status,
             error_message=error_message,
             ts=datetime.now(timezone.utc).isoformat(),
+            cache=cache,
+            timing=timing,
+            continuations=continuations,
+            attempts=attempts,
+            backoff_s=backoff_s,
+            structured_output=structured_output,
+            recovered=recovered,
+            hedged=hedged,
+            duplicate_of=duplicate_of,
+            missing_files=missing_files or None,
         )
-        with self.ledger_path.open("a", encoding="utf-8") as handle:
-            handle.write(json.dumps(record.__dict__, ensure_ascii=False))
-            handle.write("\n")
-
-        self.records.append(record)
+        line = json.dumps(record.__dict__, ensure_ascii=False)
+        # Concurrent reviewers share one ledger; serialise the append so JSONL lines never interleave.
+        with self._lock:
+            with self.ledger_path.open("a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.write("\n")
 
-        if status == "ok":
-            for file_entry in files:
-                key = self._target_key_from_entry(file_entry)
-                if key:
-                    self.covered.add(key)
+            self.records.append(record)
+            self.covered.update(self._covered_keys(record))
 
     def build_report(self, review_results: Optional[List[Dict[str, object]]] = None) -> Dict[str, object]:
         total_segments = len(self.targets)
@@ -198,15 +323,18 @@ class CoverageLedger:
             data = target.__dict__.copy()
             if reason := self.reasons.get(key):
                 data["reason"] = reason
+            if source := self.duplicate_sources.get(key):
+                data["duplicate_of"] = source
             missed_details.append(data)
 
         reviewed_segments: Dict[str, Dict[str, str]] = {}
         for record in self.records:
             if record.status != "ok":
                 continue
+            missing = {entry.get("chunk_id") for entry in record.missing_files or []}
             for entry in record.files:
                 path = entry.get("path")
-                if not isinstance(path, str):
+                if not isinstance(path, str) or entry.get("chunk_id") in missing:
                     continue
                 reviewed_segments[path] = {
                     "chunk_id": str(entry.get("chunk_id", "")),
@@ -250,6 +378,18 @@ class CoverageLedger:
                     risk_histogram.setdefault("other", 0)
                     risk_histogram["other"] += 1
 
+        cache_stats = {"hits": 0, "misses": 0, "replayed": 0}
+        referenced_segments = sum(
+            len(record.files) for record in self.records if record.duplicate_of and record.status == "ok"
+        )
+        for record in self.records:
+            if record.cache == "hit":
+                cache_stats["hits"] += 1
+            elif record.cache == "miss":
+                cache_stats["misses"] += 1
+            elif record.cache == "replay":
+                cache_stats["replayed"] += 1
+
         issue_hotspots_sorted = [
             {"directory": directory, "issues": count}
             for directory, count in sorted(
@@ -289,6 +429,9 @@ class CoverageLedger:
             "severity_histogram": severity_histogram,
             "risk_histogram": risk_histogram,
             "issue_hotspots": issue_hotspots_sorted,
+            "cache": cache_stats,
+            "superseded_segments": len(self.superseded),
+            "referenced_segments": referenced_segments,
         }
 
         with self.report_json_path.open("w", encoding="utf-8") as handle:
@@ -306,6 +449,19 @@ class CoverageLedger:
         lines.append(f"- Segments covered: {report.get('covered_segments')} / {report.get('total_segments')}")
         ratio = report.get("coverage_ratio", 0.0)
         lines.append(f"- Coverage ratio: {ratio:.2%}")
+        cache_stats: Dict[str, int] = report.get("cache", {})  # type: ignore
+        if cache_stats.get("hits") or cache_stats.get("misses"):
+            lines.append(f"- LLM cache: {cache_stats.get('hits', 0)} hits / {cache_stats.get('misses', 0)} misses")
+        if cache_stats.get("replayed"):
+            lines.append(f"- Replayed from findings store: {cache_stats['replayed']} requests")
+        if report.get("superseded_segments"):
+            lines.append(
+                f"- Failed segments split and re-reviewed: {report['superseded_segments']}"
+            )
+        if report.get("referenced_segments"):
+            lines.append(
+                f"- Covered by reference to an identical file: {report['referenced_segments']} segments"
+            )
         lines.append("")
 
         lines.append("## Directory coverage")
@@ -339,12 +495,15 @@ class CoverageLedger:
             lines.append("| (none) | - | - | - |")
         else:
             for item in missed:
+                reason = str(item.get("reason", ""))
+                if item.get("duplicate_of"):
+                    reason = f"{reason} (duplicate of {item['duplicate_of']})"
                 lines.append(
                     "| {path} | {lines} | {chunk} | {reason} |".format(
                         path=item.get("path", ""),
                         lines=f"{item.get('start_line', '-')}-{item.get('end_line', '-')}",
                         chunk=item.get("chunk_id", ""),
-                        reason=item.get("reason", ""),
+                        reason=reason,
                     )
                 )
         lines.append("")
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class FindingsStore:
+    """Persistent, commit-independent store of review findings keyed by reviewed content.
+
+    Entries are appended to a JSONL file; when the same key appears more than once the
+    last line wins, mirroring how the coverage ledger is replayed.
+    """
+
+    path: Path
+    config_hash: str
+    _entries: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.path = Path(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+
+        with self.path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                key = data.get("key")
+                reviews = data.get("reviews")
+                if isinstance(key, str) and isinstance(reviews, list):
+                    self._entries[key] = reviews
+
+    @staticmethod
+    def make_config_hash(config: Dict[str, Any]) -> str:
+        material = json.dumps(config, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def key_for(self, entry: Dict[str, object]) -> Optional[str]:
+        sha = entry.get("sha256")
+        start = entry.get("start_line")
+        end = entry.get("end_line")
+        if not isinstance(sha, str) or not isinstance(start, int) or not isinstance(end, int):
+            return None
+        return f"{self.config_hash}:{sha}:{start}:{end}"
+
+    def lookup(self, entry: Dict[str, object]) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the stored reviews for a ledger file entry, if any."""
+
+        key = self.key_for(entry)
+        if key is None:
+            return None
+        with self._lock:
+            reviews = self._entries.get(key)
+        return copy.deepcopy(reviews) if reviews is not None else None
+
+    def store(
+        self,
+        entry: Dict[str, object],
+        reviews: List[Dict[str, Any]],
+        *,
+        model: str,
+        commit: Optional[str],
+    ) -> None:
+        key = self.key_for(entry)
+        if key is None:
+            return
+        stored = copy.deepcopy(reviews)
+        record = {
+            "key": key,
+            "path": entry.get("path"),
+            "sha256": entry.get("sha256"),
+            "start_line": entry.get("start_line"),
+            "end_line": entry.get("end_line"),
+            "model": model,
+            "commit": commit,
+            "reviews": stored,
+            "ts": datetime.now(timezone.utc).isoformat(),
+        }
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.write("\n")
+            self._entries[key] = stored
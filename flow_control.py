@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+class DeadlineExceeded(Exception):
+    """A request was refused because it would no longer finish within the time budget."""
+
+
+@dataclass
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on the number of LLM requests in flight.
+
+    The limit grows while normalised latency (seconds per prompt + completion token) stays
+    close to the baseline observed for requests of a similar size and is halved on overload
+    signals (429/503, timeouts) or latency spikes. Until the first decrease the limit grows by one per success (slow start);
+    afterwards it grows by roughly one per ``limit`` successes.
+    """
+
+    max_limit: int
+    min_limit: int = 1
+    latency_tolerance: float = 2.0
+    decrease_factor: float = 0.5
+    baseline_alpha: float = 0.05
+    max_history: int = 2000
+    limit: float = field(init=False)
+    in_flight: int = field(default=0, init=False)
+    history: List[Dict[str, float]] = field(default_factory=list, init=False, repr=False)
+    _baselines: Dict[int, float] = field(default_factory=dict, init=False, repr=False)
+    _slow_start: bool = field(default=True, init=False, repr=False)
+    _last_decrease: float = field(default=0.0, init=False, repr=False)
+    _started: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _condition: threading.Condition = field(
+        default_factory=threading.Condition, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        self.max_limit = max(1, self.max_limit)
+        self.min_limit = max(1, min(self.min_limit, self.max_limit))
+        self.limit = float(self.min_limit)
+        self._record_locked()
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """Block until another request may start; return the time spent waiting.
+
+        Raises ``DeadlineExceeded`` instead of waiting past ``deadline`` (monotonic time).
+        """
+
+        started = time.monotonic()
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                if deadline is None:
+                    self._condition.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded("no free request slot before the deadline")
+                self._condition.wait(timeout=remaining)
+            self.in_flight += 1
+        return time.monotonic() - started
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now, e.g. for an optional hedge request."""
+
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, *, outcome: str, latency: float = 0.0, tokens: int = 0) -> None:
+        """Report a finished request: ``ok``, ``overload`` or ``error`` (no signal).
+
+        ``tokens`` counts prompt and completion: prefill takes real time too, so a large
+        chunk with a short answer must not look like a latency spike. Baselines are kept per
+        power-of-two size class, since the fixed cost of a request makes small ones slower
+        per token than large ones.
+        """
+
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            previous = int(self.limit)
+            if outcome == 'overload':
+                self._decrease_locked(latency)
+            elif outcome == 'ok':
+                per_token = latency / max(1, tokens)
+                size_class = max(1, tokens).bit_length()
+                baseline = self._baselines.get(size_class)
+                if baseline is not None and per_token > baseline * self.latency_tolerance:
+                    self._decrease_locked(latency)
+                else:
+                    self._baselines[size_class] = (
+                        per_token
+                        if baseline is None
+                        else baseline + self.baseline_alpha * (per_token - baseline)
+                    )
+                    step = 1.0 if self._slow_start else 1.0 / max(1.0, self.limit)
+                    self.limit = min(float(self.max_limit), self.limit + step)
+            if int(self.limit) != previous:
+                self._record_locked()
+            self._condition.notify_all()
+
+    def _decrease_locked(self, latency: float) -> None:
+        now = time.monotonic()
+        # Requests that were already in flight during the same congestion episode report
+        # it too; only react once per round trip.
+        if now - self._last_decrease < max(latency, 1.0):
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+
+    def _record_locked(self) -> None:
+        if len(self.history) >= self.max_history:
+            return
+        self.history.append({
+            't': round(time.monotonic() - self._started, 3),
+            'limit': int(self.limit),
+        })
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            limits = [point['limit'] for point in self.history]
+            return {
+                'mode': 'adaptive',
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'final_limit': int(self.limit),
+                'peak_limit': max(limits) if limits else int(self.limit),
+                # Keyed by the smallest token count of each size class.
+                'baseline_s_per_token': {
+                    str(1 << (size_class - 1)): baseline
+                    for size_class, baseline in sorted(self._baselines.items())
+                },
+                'timeline': list(self.history),
+            }
+
+
+@dataclass
+class TokenBucketRateLimiter:
+    """Token-bucket ceiling on LLM requests and tokens per minute.
+
+    Each request is charged its estimated prompt tokens before it is sent; ``settle`` later
+    corrects the charge with the tokens the server actually processed, so the bucket may
+    go negative and delay the next requests. Waiters are admitted in arrival order. A
+    request larger than the whole bucket waits for a full bucket instead of forever.
+    """
+
+    tokens_per_minute: int = 0
+    requests_per_minute: int = 0
+    requests: int = field(default=0, init=False)
+    tokens: int = field(default=0, init=False)
+    wait_s: float = field(default=0.0, init=False)
+    _token_level: float = field(default=0.0, init=False, repr=False)
+    _request_level: float = field(default=0.0, init=False, repr=False)
+    _updated: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _turn: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.tokens_per_minute = max(0, self.tokens_per_minute)
+        self.requests_per_minute = max(0, self.requests_per_minute)
+        self._token_level = float(self.tokens_per_minute)
+        self._request_level = float(self.requests_per_minute)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.tokens_per_minute or self.requests_per_minute)
+
+    def _refill_locked(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.tokens_per_minute:
+            self._token_level = min(
+                float(self.tokens_per_minute),
+                self._token_level + elapsed * self.tokens_per_minute / 60.0,
+            )
+        if self.requests_per_minute:
+            self._request_level = min(
+                float(self.requests_per_minute),
+                self._request_level + elapsed * self.requests_per_minute / 60.0,
+            )
+
+    def _deficit_seconds_locked(self, tokens: int) -> float:
+        wait = 0.0
+        if self.tokens_per_minute:
+            needed = min(float(tokens), float(self.tokens_per_minute))
+            if self._token_level < needed:
+                wait = max(wait, (needed - self._token_level) * 60.0 / self.tokens_per_minute)
+        if self.requests_per_minute and self._request_level < 1.0:
+            wait = max(wait, (1.0 - self._request_level) * 60.0 / self.requests_per_minute)
+        return wait
+
+    def acquire(self, tokens: int, deadline: Optional[float] = None) -> float:
+        """Block until a request of ``tokens`` prompt tokens fits; return the time waited.
+
+        Raises ``DeadlineExceeded`` instead of waiting past ``deadline`` (monotonic time).
+        """
+
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        try:
+            # Holding the turn lock while sleeping keeps admission FIFO: a small request that
+            # arrives later cannot keep starving a large one that is waiting for the bucket.
+            timeout = -1 if deadline is None else max(0.0, deadline - started)
+            if not self._turn.acquire(timeout=timeout):
+                raise DeadlineExceeded("the rate limit queue did not clear before the deadline")
+            try:
+                while True:
+                    with self._lock:
+                        self._refill_locked()
+                        wait = self._deficit_seconds_locked(tokens)
+                        if wait <= 0.0:
+                            self._take_locked(tokens)
+                            break
+                    if deadline is not None and time.monotonic() + wait > deadline:
+                        raise DeadlineExceeded("the rate limit would delay the request past the deadline")
+                    time.sleep(wait)
+            finally:
+                self._turn.release()
+        finally:
+            waited = time.monotonic() - started
+            with self._lock:
+                self.wait_s += waited
+        return waited
+
+    def try_acquire(self, tokens: int) -> bool:
+        """Charge ``tokens`` only if they fit right now and nobody is queued before us."""
+
+        if not self.enabled:
+            return True
+        if not self._turn.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                self._refill_locked()
+                if self._deficit_seconds_locked(tokens) > 0.0:
+                    return False
+                self._take_locked(tokens)
+                return True
+        finally:
+            self._turn.release()
+
+    def _take_locked(self, tokens: int) -> None:
+        if self.tokens_per_minute:
+            self._token_level -= tokens
+        if self.requests_per_minute:
+            self._request_level -= 1.0
+        self.requests += 1
+        self.tokens += tokens
+
+    def settle(self, charged: int, actual: int) -> None:
+        """Replace an earlier ``charged`` estimate with the ``actual`` token usage."""
+
+        if not self.enabled:
+            return
+        with self._lock:
+            self._refill_locked()
+            delta = actual - charged
+            self.tokens += delta
+            if self.tokens_per_minute:
+                self._token_level = min(float(self.tokens_per_minute), self._token_level - delta)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'tokens_per_minute': self.tokens_per_minute or None,
+                'requests_per_minute': self.requests_per_minute or None,
+                'requests': self.requests,
+                'tokens': self.tokens,
+                'wait_s': round(self.wait_s, 3),
+            }
+
+
+@dataclass
+class DeadlineGate:
+    """Admission control for a run with a fixed wall-clock budget.
+
+    A new request is admitted only if it is projected to finish before the deadline. The
+    projection uses an exponentially weighted average of seconds per cost unit (estimated
+    prompt tokens plus a fixed per-request cost) observed on earlier requests; before the
+    first observation only the deadline itself is checked.
+    """
+
+    budget_s: float
+    alpha: float = 0.2
+    started: float = field(default_factory=time.monotonic)
+    refused: int = field(default=0, init=False)
+    _seconds_per_unit: Optional[float] = field(default=None, init=False, repr=False)
+    _first_refusal: Optional[float] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    @property
+    def deadline(self) -> float:
+        return self.started + self.budget_s
+
+    def projected_seconds(self, cost: int) -> float:
+        with self._lock:
+            return cost * self._seconds_per_unit if self._seconds_per_unit is not None else 0.0
+
+    def admits(self, cost: int, delay: float = 0.0) -> bool:
+        """Return whether a request of ``cost`` starting after ``delay`` seconds fits the budget."""
+
+        finish = time.monotonic() + delay + self.projected_seconds(cost)
+        if finish <= self.deadline:
+            return True
+        self.refuse()
+        return False
+
+    def latest_start(self, cost: int) -> float:
+        """The last moment (monotonic time) a request of ``cost`` may still be sent."""
+
+        return self.deadline - self.projected_seconds(cost)
+
+    def refuse(self) -> None:
+        """Count a request that was turned away, e.g. while it waited in a queue."""
+
+        with self._lock:
+            self.refused += 1
+            if self._first_refusal is None:
+                self._first_refusal = time.monotonic()
+
+    def observe(self, seconds: float, cost: int) -> None:
+        if cost <= 0:
+            return
+        rate = seconds / cost
+        with self._lock:
+            self._seconds_per_unit = (
+                rate
+                if self._seconds_per_unit is None
+                else self._seconds_per_unit + self.alpha * (rate - self._seconds_per_unit)
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'budget_s': self.budget_s,
+                'elapsed_s': round(time.monotonic() - self.started, 3),
+                'refused_requests': self.refused,
+                'cutoff_at_s': (
+                    round(self._first_refusal - self.started, 3)
+                    if self._first_refusal is not None
+                    else None
+                ),
+                'seconds_per_cost_token': self._seconds_per_unit,
+            }
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Set, Tuple
+
+_DECODER = json.JSONDecoder()
+_FILE_KEY = re.compile(r'"file"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_REVIEWS_KEY = re.compile(r'"reviews"\s*:\s*\[')
+
+
+@dataclass
+class RecoveredJSON:
+    """A value salvaged from model output that ``json.loads`` rejected."""
+
+    value: Any
+    method: str
+
+    @property
+    def partial(self) -> bool:
+        """Whether the answer was cut off, so some of the requested files may be missing."""
+
+        return self.method == 'truncated'
+
+    def complete_files(self) -> Set[str]:
+        """Files of a batch answer whose ``reviews`` array is complete."""
+
+        if not isinstance(self.value, list):
+            return set()
+        return {
+            str(item['file']) for item in self.value
+            if isinstance(item, dict) and 'file' in item and not item.get('truncated')
+        }
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before ``}`` or ``]``, leaving string contents alone."""
+
+    out: List[str] = []
+    in_string = False
+    escaped = False
+    pending_comma: Optional[int] = None
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch in '}]' and pending_comma is not None:
+            del out[pending_comma]
+        if ch == ',':
+            pending_comma = len(out)
+        elif not ch.isspace():
+            pending_comma = None
+        if ch == '"':
+            in_string = True
+        out.append(ch)
+    return ''.join(out)
+
+
+def _loads_lenient(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(strip_trailing_commas(text))
+
+
+def balanced_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` of top-level ``{...}`` / ``[...]`` spans with balanced brackets."""
+
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for idx, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            # Quotes in the prose around the JSON do not open strings.
+            in_string = depth > 0
+        elif ch in '{[':
+            if depth == 0:
+                start = idx
+            depth += 1
+        elif ch in '}]' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                yield start, idx + 1
+
+
+def _is_review_payload(value: Any) -> bool:
+    if isinstance(value, dict):
+        return isinstance(value.get('reviews'), list) or isinstance(value.get('files'), list)
+    if isinstance(value, list):
+        return any(isinstance(item, dict) and 'file' in item for item in value)
+    return False
+
+
+def _salvage_array(text: str, start: int) -> Tuple[List[Any], bool]:
+    """Decode complete elements of a JSON array starting at ``text[start] == '['``.
+
+    Also returns whether the array is closed, i.e. no element was cut off.
+    """
+
+    items: List[Any] = []
+    pos = start + 1
+    while pos < len(text):
+        while pos < len(text) and (text[pos].isspace() or text[pos] == ','):
+            pos += 1
+        if pos >= len(text):
+            break
+        if text[pos] == ']':
+            return items, True
+        try:
+            item, pos = _DECODER.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        items.append(item)
+    return items, False
+
+
+def _salvage_truncated(text: str) -> Optional[Any]:
+    """Rebuild review answers from output that stops in the middle of a ``reviews`` array.
+
+    Per-file entries whose ``reviews`` array was cut off are kept but flagged ``truncated``.
+    """
+
+    file_matches = list(_FILE_KEY.finditer(text))
+    if file_matches:
+        salvaged = []
+        for match in file_matches:
+            reviews_match = _REVIEWS_KEY.search(text, match.end())
+            reviews, closed = _salvage_array(text, reviews_match.end() - 1) if reviews_match else ([], False)
+            try:
+                file_name = json.loads(f'"{match.group(1)}"')
+            except json.JSONDecodeError:
+                continue
+            item = {'file': file_name, 'reviews': [r for r in reviews if isinstance(r, dict)]}
+            if not closed:
+                item['truncated'] = True
+            salvaged.append(item)
+        # Without a single complete entry there is no evidence the answer got anywhere.
+        return salvaged if any(item['reviews'] for item in salvaged) else None
+
+    reviews_match = _REVIEWS_KEY.search(text)
+    if reviews_match:
+        reviews = [r for r in _salvage_array(text, reviews_match.end() - 1)[0] if isinstance(r, dict)]
+        return {'reviews': reviews} if reviews else None
+    return None
+
+
+def recover_json(text: str) -> Optional[RecoveredJSON]:
+    """Extract a review answer from model output that is not strict JSON.
+
+    Tried in order: the whole text without trailing commas, balanced JSON spans embedded in
+    prose (several bare per-file objects are merged into a list), and finally complete
+    review entries from a truncated ``reviews`` array.
+    """
+
+    try:
+        return RecoveredJSON(json.loads(strip_trailing_commas(text)), 'trailing_commas')
+    except json.JSONDecodeError:
+        pass
+
+    values = []
+    for start, end in balanced_spans(text):
+        try:
+            values.append(_loads_lenient(text[start:end]))
+        except json.JSONDecodeError:
+            continue
+    per_file = [value for value in values if isinstance(value, dict) and 'file' in value]
+    if len(per_file) > 1:
+        return RecoveredJSON(per_file, 'concatenated_objects')
+    for value in values:
+        if _is_review_payload(value):
+            return RecoveredJSON(value, 'embedded')
+
+    salvaged = _salvage_truncated(text)
+    if salvaged is not None:
+        return RecoveredJSON(salvaged, 'truncated')
+    return None
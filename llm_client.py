@@ -0,0 +1,768 @@
+from __future__ import annotations
+
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from flow_control import DeadlineExceeded
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+class LLMResponseError(Exception):
+    """The API answered with a non-200 status."""
+
+    def __init__(self, status_code: int, text: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(f"status {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class StreamAbortedError(Exception):
+    """A streaming completion was cut off because its output could not be used."""
+
+    def __init__(self, reason: str, content: str) -> None:
+        super().__init__(f"stream aborted ({reason}): {content[:200]!r}")
+        self.reason = reason
+        self.content = content
+
+
+class JsonStreamMonitor:
+    """Incrementally checks that streamed model output is turning into JSON.
+
+    ``feed`` returns ``"ok"`` while the output still looks usable, ``"invalid"`` when no JSON
+    has started within ``max_lead_chars`` of prose (a Markdown code fence is allowed), and
+    ``"trailing"`` once a JSON value is complete and the model keeps generating more than
+    ``max_trailing_chars`` of unrelated text. Prose around the JSON and several JSON values
+    in a row are left to ``json_recovery``, so the caller keeps the full text either way.
+    """
+
+    MAX_FENCE_CHARS = 24
+
+    def __init__(self, max_trailing_chars: int = 256, max_lead_chars: int = 512) -> None:
+        self.max_trailing_chars = max_trailing_chars
+        self.max_lead_chars = max_lead_chars
+        self._state = 'lead'
+        self._fence = ''
+        self._fenced = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._lead = 0
+        self._trailing = 0
+
+    def feed(self, text: str) -> str:
+        for ch in text:
+            verdict = self._feed_char(ch)
+            if verdict != 'ok':
+                return verdict
+        return 'ok'
+
+    def _feed_char(self, ch: str) -> str:
+        if self._state == 'lead':
+            if ch.isspace():
+                return 'ok'
+            if ch == '`' and not self._fenced and not self._lead:
+                self._state = 'fence'
+                self._fence = ch
+                return 'ok'
+            if ch in '{[':
+                self._state = 'body'
+                self._depth = 1
+                return 'ok'
+            self._lead += 1
+            return 'invalid' if self._lead > self.max_lead_chars else 'ok'
+
+        if self._state == 'fence':
+            if ch == '\n':
+                if not self._fence.startswith('```'):
+                    return 'invalid'
+                self._state = 'lead'
+                self._fenced = True
+                return 'ok'
+            self._fence += ch
+            if len(self._fence) <= 3 and ch != '`':
+                return 'invalid'
+            if len(self._fence) > self.MAX_FENCE_CHARS:
+                return 'invalid'
+            return 'ok'
+
+        if self._state == 'body':
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                return 'ok'
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = 'done'
+            return 'ok'
+
+        if ch in '{[':
+            # Another JSON value, e.g. one object per file written back to back.
+            self._state = 'body'
+            self._depth = 1
+            self._trailing = 0
+            return 'ok'
+        if not ch.isspace() and ch != '`':
+            self._trailing += 1
+            if self._trailing > self.max_trailing_chars:
+                return 'trailing'
+        return 'ok'
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """True for failures that mean the server is saturated rather than broken."""
+
+    if isinstance(exc, LLMResponseError):
+        return exc.status_code in (429, 503)
+    if isinstance(exc, StreamAbortedError):
+        return exc.reason == 'max_duration'
+    return isinstance(exc, requests.exceptions.Timeout)
+
+
+def is_response_format_rejection(exc: BaseException) -> bool:
+    """True when the server refused a request because of its ``response_format``."""
+
+    if not isinstance(exc, LLMResponseError) or exc.status_code not in (400, 422, 501):
+        return False
+    text = exc.text.lower()
+    return any(word in text for word in ('response_format', 'json_schema', 'schema', 'grammar'))
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient LLM server failures."""
+
+    max_retries: int = 3
+    backoff_base: float = 2.0
+    backoff_max: float = 60.0
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        if isinstance(exc, LLMResponseError):
+            return exc.status_code in RETRYABLE_STATUS_CODES
+        if isinstance(exc, StreamAbortedError):
+            return exc.reason == 'max_duration'
+        return isinstance(
+            exc,
+            (requests.exceptions.Timeout, requests.exceptions.ConnectionError),
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+
+@dataclass
+class HedgePolicy:
+    """Decides when a slow request deserves a duplicate on another endpoint.
+
+    The threshold is the ``percentile`` of recent request latencies; hedging starts only
+    after ``min_samples`` requests so the first slow ones do not all get duplicated.
+    """
+
+    percentile: float = 95.0
+    min_samples: int = 10
+    window: int = 200
+    hedged: int = field(default=0, init=False)
+    hedge_wins: int = field(default=0, init=False)
+    _latencies: List[float] = field(default_factory=list, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            if len(self._latencies) > self.window:
+                del self._latencies[0]
+
+    def threshold(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(round(self.percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def record(self, hedge_won: bool) -> None:
+        with self._lock:
+            self.hedged += 1
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        threshold = self.threshold()
+        with self._lock:
+            return {
+                'percentile': self.percentile,
+                'threshold_s': round(threshold, 3) if threshold is not None else None,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+            }
+
+
+@dataclass
+class CircuitBreaker:
+    """Stops dispatching requests while the LLM server keeps failing.
+
+    After ``failure_threshold`` consecutive transient failures the breaker opens and every
+    caller of ``before_request`` waits for ``cooldown`` seconds. Then a single trial request
+    is let through (half-open); its outcome closes the breaker or opens it again.
+    """
+
+    failure_threshold: int = 5
+    cooldown: float = 30.0
+    debug: bool = False
+    state: str = field(default='closed', init=False)
+    _failures: int = field(default=0, init=False, repr=False)
+    _opened_at: float = field(default=0.0, init=False, repr=False)
+    _trial_in_flight: bool = field(default=False, init=False, repr=False)
+    _trial_owner: Optional[int] = field(default=None, init=False, repr=False)
+    _condition: threading.Condition = field(
+        default_factory=threading.Condition, init=False, repr=False, compare=False
+    )
+
+    def before_request(self, deadline: Optional[float] = None) -> float:
+        """Block until a request may be sent; return how long the caller waited.
+
+        Raises ``DeadlineExceeded`` instead of waiting past ``deadline`` (monotonic time).
+        """
+
+        if self.failure_threshold <= 0:
+            return 0.0
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                if self.state == 'closed':
+                    break
+                if self.state == 'open':
+                    reopens = self._opened_at + self.cooldown
+                    if deadline is not None and reopens > deadline:
+                        raise DeadlineExceeded("the circuit breaker stays open past the deadline")
+                    remaining = reopens - time.monotonic()
+                    if remaining > 0:
+                        self._condition.wait(timeout=remaining)
+                        continue
+                    self.state = 'half_open'
+                if not self._trial_in_flight:
+                    self._trial_in_flight = True
+                    self._trial_owner = threading.get_ident()
+                    break
+                if deadline is None:
+                    self._condition.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded("the circuit breaker trial did not finish before the deadline")
+                self._condition.wait(timeout=remaining)
+        return time.monotonic() - started
+
+    def abandon(self) -> None:
+        """Give the trial slot back if this thread holds it but will not send its request."""
+
+        with self._condition:
+            if self._trial_in_flight and self._trial_owner == threading.get_ident():
+                self._trial_in_flight = False
+                self._trial_owner = None
+                self._condition.notify_all()
+
+    def record_success(self) -> None:
+        with self._condition:
+            if self.state != 'closed' and self.debug:
+                print("[DEBUG] サーキットブレーカー: 復旧を確認しました", file=sys.stderr)
+            self.state = 'closed'
+            self._failures = 0
+            self._trial_in_flight = False
+            self._condition.notify_all()
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._condition:
+            self._failures += 1
+            was_trial = self._trial_in_flight
+            self._trial_in_flight = False
+            if self.state == 'half_open' or (
+                self.state == 'closed' and self._failures >= self.failure_threshold
+            ):
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                print(
+                    f"LLMサーバーの連続エラーが{self._failures}回に達したため、{self.cooldown:.0f}秒間リクエストを停止します",
+                    file=sys.stderr,
+                )
+            if was_trial:
+                self._condition.notify_all()
+
+
+@dataclass
+class Completion:
+    content: str
+    finish_reason: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class StreamResult:
+    status_code: int
+    content: str = ""
+    error_text: str = ""
+    finish_reason: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = None
+    ttft: Optional[float] = None
+    generation_time: float = 0.0
+    chunks: int = 0
+    aborted: Optional[str] = None
+    retry_after: Optional[float] = None
+
+
+@dataclass
+class Endpoint:
+    url: str
+    outstanding: int = 0
+    healthy: bool = True
+    consecutive_failures: int = 0
+    served: int = 0
+    failures: int = 0
+
+    @property
+    def chat_completions_url(self) -> str:
+        return f"{self.url}/chat/completions"
+
+
+@dataclass
+class EndpointPool:
+    """Least-outstanding-requests scheduler over one or more equivalent LLM servers.
+
+    An endpoint is ejected after ``eject_after`` consecutive transient failures and readmitted
+    once a health check succeeds; only ejected endpoints are probed. If every endpoint is ejected,
+    requests still go to the least busy one so retries and the circuit breaker decide.
+    """
+
+    urls: List[str]
+    eject_after: int = 3
+    debug: bool = False
+    endpoints: List[Endpoint] = field(init=False)
+    _cursor: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.endpoints = [Endpoint(url=url.rstrip('/')) for url in self.urls]
+
+    def acquire(self, exclude: Iterable[str] = ()) -> Endpoint:
+        excluded = set(exclude)
+        with self._lock:
+            healthy = [e for e in self.endpoints if e.healthy]
+            candidates = [e for e in healthy if e.url not in excluded] or healthy
+            if not candidates:
+                candidates = [e for e in self.endpoints if e.url not in excluded] or self.endpoints
+            # Rotate the starting point so ties are spread round-robin.
+            start = self._cursor % len(candidates)
+            self._cursor += 1
+            ordered = candidates[start:] + candidates[:start]
+            chosen = min(ordered, key=lambda e: e.outstanding)
+            chosen.outstanding += 1
+            return chosen
+
+    def release(
+        self, endpoint: Endpoint, *, ok: bool, transient: bool = False, cancelled: bool = False
+    ) -> None:
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if cancelled:
+                # The losing copy of a hedged request says nothing about the endpoint's health.
+                return
+            if ok:
+                endpoint.served += 1
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.failures += 1
+            if not transient:
+                return
+            endpoint.consecutive_failures += 1
+            if (
+                endpoint.healthy
+                and len(self.endpoints) > 1
+                and self.eject_after > 0
+                and endpoint.consecutive_failures >= self.eject_after
+            ):
+                endpoint.healthy = False
+                print(
+                    f"エンドポイントを一時的に除外します（連続エラー {endpoint.consecutive_failures}回）: {endpoint.url}",
+                    file=sys.stderr,
+                )
+
+    def ejected(self) -> List[Endpoint]:
+        with self._lock:
+            return [e for e in self.endpoints if not e.healthy]
+
+    def readmit(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            if endpoint.healthy:
+                return
+            endpoint.healthy = True
+            endpoint.consecutive_failures = 0
+            print(f"エンドポイントを復帰させます: {endpoint.url}", file=sys.stderr)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    'url': e.url,
+                    'served': e.served,
+                    'failures': e.failures,
+                    'healthy': e.healthy,
+                }
+                for e in self.endpoints
+            ]
+
+
+_connect_time = threading.local()
+_request_cancel = threading.local()
+
+
+def _record_connect(started: float) -> None:
+    _connect_time.seconds = getattr(_connect_time, 'seconds', 0.0) + time.monotonic() - started
+
+
+class RequestCancel:
+    """``threading.Event``-like flag that also aborts the requests sent under it.
+
+    While a streaming request runs with this token, its socket is registered here; ``set()``
+    shuts the socket down. A request still waiting for the response headers fails at once
+    instead of holding its connection until the timeout, and the server sees the client go.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._sockets: Dict[int, socket.socket] = {}
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def set(self) -> None:
+        with self._lock:
+            self._event.set()
+            sockets = list(self._sockets.values())
+        for sock in sockets:
+            _shutdown_socket(sock)
+
+    def _attach(self, sock: socket.socket) -> None:
+        with self._lock:
+            self._sockets[threading.get_ident()] = sock
+            cancelled = self._event.is_set()
+        if cancelled:
+            _shutdown_socket(sock)
+
+    def _detach(self) -> None:
+        # Must run before the connection goes back to the pool and serves another request.
+        with self._lock:
+            self._sockets.pop(threading.get_ident(), None)
+
+
+def _shutdown_socket(sock: socket.socket) -> None:
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _attach_cancel(sock: Optional[socket.socket]) -> None:
+    cancel: Optional[RequestCancel] = getattr(_request_cancel, 'token', None)
+    if cancel is not None and sock is not None:
+        cancel._attach(sock)
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        started = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            _record_connect(started)
+
+    def request(self, *args: Any, **kwargs: Any) -> None:
+        super().request(*args, **kwargs)
+        _attach_cancel(self.sock)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        started = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            _record_connect(started)
+
+    def request(self, *args: Any, **kwargs: Any) -> None:
+        super().request(*args, **kwargs)
+        _attach_cancel(self.sock)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record how long TCP/TLS setup took on this thread.
+
+    They also hand their socket to the ``RequestCancel`` of the request being sent, if any.
+    """
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def take_connect_time() -> float:
+    """Return and reset the connection setup time spent by the current thread, in seconds.
+
+    Requests reuse pooled connections, so this is zero unless a new one was opened.
+    """
+
+    seconds = getattr(_connect_time, 'seconds', 0.0)
+    _connect_time.seconds = 0.0
+    return seconds
+
+
+@dataclass
+class LLMClient:
+    """Long-lived HTTP client for one or more OpenAI-compatible chat completions endpoints."""
+
+    api_urls: List[str]
+    api_key: Optional[str] = None
+    pool_size: int = 1
+    debug: bool = False
+    eject_after: int = 3
+    health_check_interval: float = 30.0
+    health_check_timeout: float = 5.0
+    pool: EndpointPool = field(init=False)
+    session: requests.Session = field(init=False, repr=False)
+    _adapter: HTTPAdapter = field(init=False, repr=False)
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _health_thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.pool = EndpointPool(self.api_urls, eject_after=self.eject_after, debug=self.debug)
+        self.pool_size = max(1, self.pool_size)
+        # pool_maxsize caps connections per host; pool_block makes callers wait for a free
+        # connection instead of opening throwaway ones beyond the limit.
+        self._adapter = _TimedHTTPAdapter(
+            pool_connections=max(4, len(self.pool.endpoints)),
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+        if self.api_key:
+            self.session.headers['Authorization'] = f'Bearer {self.api_key}'
+
+        if len(self.pool.endpoints) > 1 and self.health_check_interval > 0:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name='llm-health-check', daemon=True
+            )
+            self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(self.health_check_interval):
+            # Endpoints in rotation are judged by real requests (eject_after); a slow probe
+            # on a busy server is not a reason to drop it.
+            for endpoint in self.pool.ejected():
+                if self.check_health(endpoint):
+                    self.pool.readmit(endpoint)
+
+    def check_health(self, endpoint: Endpoint) -> bool:
+        try:
+            response = self.session.get(f"{endpoint.url}/models", timeout=self.health_check_timeout)
+        except requests.exceptions.RequestException:
+            return False
+        return response.status_code == 200
+
+    def post_chat_completion(
+        self,
+        payload: Dict[str, Any],
+        timeout: float,
+        endpoint: Endpoint,
+    ) -> requests.Response:
+        response = self.session.post(endpoint.chat_completions_url, json=payload, timeout=timeout)
+        self._debug_connection_stats(endpoint)
+        return response
+
+    def stream_chat_completion(
+        self,
+        payload: Dict[str, Any],
+        timeout: float,
+        endpoint: Endpoint,
+        monitor: Optional[JsonStreamMonitor] = None,
+        max_duration: Optional[float] = None,
+        cancel: Optional[RequestCancel] = None,
+    ) -> StreamResult:
+        """Send a streaming request and consume the server-sent events as they arrive.
+
+        ``timeout`` bounds each socket read; ``max_duration`` bounds the whole generation.
+        Setting ``cancel`` shuts the connection down, even before the first event, which
+        tells the server to stop; the request then raises or ends as ``cancelled``.
+        Closing the response early for any other reason drops the connection too.
+        """
+
+        body = dict(payload)
+        body['stream'] = True
+        body.setdefault('stream_options', {'include_usage': True})
+
+        started = time.monotonic()
+        first_token_at: Optional[float] = None
+        last_token_at: Optional[float] = None
+        parts = []
+
+        _request_cancel.token = cancel
+        try:
+            response = self.session.post(
+                endpoint.chat_completions_url, json=body, timeout=timeout, stream=True
+            )
+        except BaseException:
+            if cancel is not None:
+                cancel._detach()
+            raise
+        finally:
+            _request_cancel.token = None
+        try:
+            self._debug_connection_stats(endpoint)
+            result = StreamResult(status_code=response.status_code)
+            if response.status_code != 200:
+                result.error_text = response.text
+                result.retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                return result
+
+            # With chunked transfer encoding, chunk_size=None yields each chunk as it arrives;
+            # otherwise it would block until EOF, so fall back to small reads.
+            chunk_size = None if getattr(response.raw, 'chunked', False) else 64
+            for raw_line in response.iter_lines(chunk_size=chunk_size):
+                if cancel is not None and cancel.is_set():
+                    result.aborted = 'cancelled'
+                    break
+                if not raw_line or not raw_line.startswith(b'data:'):
+                    continue
+                data = raw_line[5:].strip()
+                if data == b'[DONE]':
+                    break
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+
+                if event.get('usage'):
+                    result.usage = event['usage']
+                choices = event.get('choices') or []
+                if not choices:
+                    continue
+                choice = choices[0]
+                if choice.get('finish_reason'):
+                    result.finish_reason = choice['finish_reason']
+                delta = (choice.get('delta') or {}).get('content') or ''
+                if not delta:
+                    continue
+
+                now = time.monotonic()
+                if first_token_at is None:
+                    first_token_at = now
+                last_token_at = now
+                parts.append(delta)
+                result.chunks += 1
+
+                if monitor is not None:
+                    verdict = monitor.feed(delta)
+                    if verdict == 'invalid':
+                        result.aborted = 'not_json'
+                        break
+                    if verdict == 'trailing':
+                        result.aborted = 'trailing_output'
+                        break
+                if max_duration is not None and now - started > max_duration:
+                    result.aborted = 'max_duration'
+                    break
+            if cancel is not None and cancel.is_set() and not result.aborted:
+                # A shut down socket reads as a clean end of stream.
+                result.aborted = 'cancelled'
+        finally:
+            if cancel is not None:
+                cancel._detach()
+            response.close()
+
+        result.content = ''.join(parts)
+        if first_token_at is not None:
+            result.ttft = first_token_at - started
+            result.generation_time = (last_token_at or first_token_at) - first_token_at
+        return result
+
+    def _debug_connection_stats(self, endpoint: Endpoint) -> None:
+        if not self.debug:
+            return
+        stats = self.connection_stats(endpoint)
+        print(
+            "[DEBUG] HTTP接続プール ({url}): 新規接続 {connections} / リクエスト {requests} (再利用率 {reuse:.1%})".format(
+                url=endpoint.url, **stats
+            ),
+            file=sys.stderr,
+        )
+
+    def connection_stats(self, endpoint: Endpoint) -> Dict[str, Any]:
+        """Return how many connections were opened versus requests sent to the endpoint host."""
+
+        parsed = urlsplit(endpoint.url)
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        connections = 0
+        requests_sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None or pool.host != parsed.hostname or pool.port != port:
+                continue
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+        reuse = 1 - (connections / requests_sent) if requests_sent else 0.0
+        return {'connections': connections, 'requests': requests_sent, 'reuse': reuse}
+
+    def close(self) -> None:
+        self._stop.set()
+        self.session.close()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import bisect
+import json
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 30_000, 60_000, 120_000, 300_000,
+)
+
+
+@dataclass
+class RunMetrics:
+    """Run-level metrics collected while reviewing and written to ``coverage/metrics.json``."""
+
+    path: Path
+    commit_sha: Optional[str] = None
+    sections: Dict[str, Any] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def update(self, name: str, data: Any) -> None:
+        with self._lock:
+            self.sections[name] = data
+
+    def write(self) -> Dict[str, Any]:
+        with self._lock:
+            payload = {
+                'commit': self.commit_sha,
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                **self.sections,
+            }
+        with Path(self.path).open('w', encoding='utf-8') as handle:
+            json.dump(payload, handle, indent=2, ensure_ascii=False)
+        return payload
+
+
+@dataclass
+class LatencyHistogram:
+    """Latency samples of one kind, summarised as buckets, totals and percentiles.
+
+    Memory stays bounded on long runs: buckets, count, sum, min and max are exact, while
+    percentiles come from a uniform reservoir of at most ``reservoir_size`` samples.
+    """
+
+    bounds: Tuple[float, ...] = LATENCY_BUCKETS_MS
+    reservoir_size: int = 1024
+    count: int = field(default=0, init=False)
+    total_ms: float = field(default=0.0, init=False)
+    _min: float = field(default=float('inf'), init=False, repr=False)
+    _max: float = field(default=0.0, init=False, repr=False)
+    _counts: List[int] = field(init=False, repr=False)
+    _reservoir: List[float] = field(default_factory=list, init=False, repr=False)
+    _rng: random.Random = field(default_factory=random.Random, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value_ms: float) -> None:
+        self.count += 1
+        self.total_ms += value_ms
+        self._min = min(self._min, value_ms)
+        self._max = max(self._max, value_ms)
+        self._counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        if len(self._reservoir) < self.reservoir_size:
+            self._reservoir.append(value_ms)
+        else:
+            slot = self._rng.randrange(self.count)
+            if slot < self.reservoir_size:
+                self._reservoir[slot] = value_ms
+
+    def bucket_counts(self) -> List[int]:
+        """Non-cumulative counts per bucket, with the overflow bucket last."""
+
+        return list(self._counts)
+
+    def snapshot(self) -> Dict[str, Any]:
+        if not self.count:
+            return {'count': 0}
+        values = sorted(self._reservoir)
+
+        def percentile(p: float) -> float:
+            return round(values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))], 1)
+
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ['le_inf']
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 1),
+            'mean_ms': round(self.total_ms / self.count, 1),
+            'min_ms': round(self._min, 1),
+            'p50_ms': percentile(50),
+            'p90_ms': percentile(90),
+            'p99_ms': percentile(99),
+            'max_ms': round(self._max, 1),
+            'buckets': dict(zip(labels, self._counts)),
+        }
+
+
+@dataclass
+class TimingRecorder:
+    """Thread-safe collection of named latency histograms (one per request phase)."""
+
+    histograms: Dict[str, LatencyHistogram] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            self.histograms.setdefault(name, LatencyHistogram()).observe(value_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+
+    def total_ms(self, name: str) -> float:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            return histogram.total_ms if histogram is not None else 0.0
+
+    def buckets(self, name: str) -> Optional[Tuple[Tuple[float, ...], List[int], float]]:
+        """Bucket bounds, non-cumulative counts and the sum (ms) of one histogram, if any."""
+
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None or not histogram.count:
+                return None
+            return histogram.bounds, histogram.bucket_counts(), histogram.total_ms
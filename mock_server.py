@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""OpenAI-compatible stand-in for an LLM server, for load tests and offline benchmarks.
+
+Answers ``/v1/chat/completions`` (plain and streaming) with valid review JSON for the
+prompts ``reviewer.py`` sends, after a configurable delay. Latency, generation speed,
+parallel slots, errors and hung requests can be tuned to reproduce a real GPU server::
+
+    python mock_server.py --port 8000 --latency lognormal:0.8:0.5 --tokens-per-second 40 --slots 4
+    python reviewer.py --api-url http://127.0.0.1:8000/v1 --code-dir ./src
+
+``GET /v1/stats`` returns the request counters, including the peak number of requests
+in flight, so concurrency behaviour can be checked from outside.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_BATCH_FILE = re.compile(r'^--- File: (.+?) ---$', re.MULTILINE)
+_LINE_RANGE = re.compile(r'^(?:Lines|行): (\d+)-(\d+)$', re.MULTILINE)
+_CODE_BLOCK = re.compile(r'```\n(.*?)\n```', re.DOTALL)
+_SEVERITIES = ('info', 'warning', 'error')
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Parse a latency distribution such as ``0.5``, ``uniform:0.2:1.5`` or ``lognormal:0.8:0.5``.
+
+    Supported forms (seconds): ``fixed:S`` (or just ``S``), ``uniform:LOW:HIGH``,
+    ``exponential:MEAN`` and ``lognormal:MEDIAN:SIGMA``.
+    """
+
+    kind, _, rest = spec.partition(':')
+    if not rest:
+        kind, rest = 'fixed', spec
+    try:
+        params = [float(value) for value in rest.split(':')]
+    except ValueError:
+        raise ValueError(f"invalid latency spec: {spec!r}") from None
+    if kind == 'fixed' and len(params) == 1:
+        return lambda rng: params[0]
+    if kind == 'uniform' and len(params) == 2:
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == 'exponential' and len(params) == 1 and params[0] > 0:
+        return lambda rng: rng.expovariate(1.0 / params[0])
+    if kind == 'lognormal' and len(params) == 2 and params[0] > 0:
+        return lambda rng: rng.lognormvariate(math.log(params[0]), params[1])
+    raise ValueError(f"invalid latency spec: {spec!r}")
+
+
+@dataclass
+class MockServerConfig:
+    host: str = '127.0.0.1'
+    port: int = 0
+    model: str = 'mock-model'
+    latency: str = '0'
+    tokens_per_second: float = 0.0  # Generation speed; 0 answers instantly
+    prompt_tokens_per_second: float = 0.0  # Prompt processing speed; 0 skips it
+    slots: int = 0  # Requests generated in parallel; 0 means unlimited
+    reject_when_busy: bool = False  # Answer 503 instead of queueing when all slots are busy
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (503,)
+    timeout_rate: float = 0.0  # Share of requests that never get an answer
+    hang_seconds: float = 600.0
+    findings_per_file: int = 1
+    chars_per_token: float = 4.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class _Stats:
+    requests: int = 0
+    completed: int = 0
+    streamed: int = 0
+    errors_injected: int = 0
+    timeouts_injected: int = 0
+    rejected_busy: int = 0
+    disconnected: int = 0
+    queued: int = 0
+    peak_queued: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {key: value for key, value in self.__dict__.items() if key != 'lock'}
+
+
+def _estimate_tokens(text: str, chars_per_token: float) -> int:
+    return max(1, math.ceil(len(text) / chars_per_token))
+
+
+def _canned_review(path: str, index: int, first_line: int, line_count: int, japanese: bool) -> Dict[str, Any]:
+    # Derived from the path and position only, so repeated runs produce identical output.
+    # Lines count from 1 within the reviewed code; the reviewer maps chunk lines to the file.
+    digest = int(hashlib.sha256(f"{path}:{first_line}:{index}".encode('utf-8')).hexdigest(), 16)
+    return {
+        'line': 1 + digest % max(1, line_count),
+        'severity': _SEVERITIES[(digest >> 8) % len(_SEVERITIES)],
+        'risk_score': 1 + (digest >> 16) % 10,
+        'message': 'モックサーバーによる指摘です。' if japanese else 'Finding generated by the mock server.',
+    }
+
+
+def canned_answer(prompt: str, findings_per_file: int, structured: bool) -> str:
+    """Build a valid review answer for a single-file or batch prompt from ``reviewer.py``."""
+
+    japanese = '日本語' in prompt or 'ファイル' in prompt
+    markers = list(_BATCH_FILE.finditer(prompt))
+    if markers:
+        entries = []
+        for idx, marker in enumerate(markers):
+            end = markers[idx + 1].start() if idx + 1 < len(markers) else len(prompt)
+            # The last file is followed by the answer format; a run of blank lines separates them.
+            section = prompt[marker.end():end].split('\n\n\n\n', 1)[0]
+            line_count = max(1, section.strip('\n').count('\n') + 1)
+            path = marker.group(1)
+            entries.append({
+                'file': path,
+                'reviews': [
+                    _canned_review(path, i, 1, line_count, japanese) for i in range(findings_per_file)
+                ],
+            })
+        return json.dumps({'files': entries} if structured else entries, ensure_ascii=False)
+
+    line_range = _LINE_RANGE.search(prompt)
+    code = _CODE_BLOCK.findall(prompt)
+    first_line, last_line = 1, code[-1].count('\n') + 1 if code else 1
+    if line_range:
+        first_line, last_line = int(line_range.group(1)), int(line_range.group(2))
+    key = hashlib.sha256((code[-1] if code else prompt).encode('utf-8')).hexdigest()
+    return json.dumps({
+        'reviews': [
+            _canned_review(key, i, first_line, last_line - first_line + 1, japanese)
+            for i in range(findings_per_file)
+        ],
+        'summary': 'モックサーバーによるレビューです。' if japanese else 'Review generated by the mock server.',
+    }, ensure_ascii=False)
+
+
+class MockLLMServer:
+    """Threaded HTTP server that can also run inside the process using it (tests, benchmarks)."""
+
+    def __init__(self, config: Optional[MockServerConfig] = None):
+        self.config = config or MockServerConfig()
+        self._latency = parse_latency(self.config.latency)
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._slots = threading.Semaphore(self.config.slots) if self.config.slots > 0 else None
+        self._stopping = threading.Event()
+        self._stats = _Stats()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = ThreadingHTTPServer((self.config.host, self.config.port), self._handler_class())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def stats(self) -> Dict[str, int]:
+        return self._stats.snapshot()
+
+    def start(self) -> 'MockLLMServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-llm-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def serve_forever(self) -> None:
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._stopping.set()
+            self._httpd.server_close()
+
+    def __enter__(self) -> 'MockLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _sample_latency(self) -> float:
+        with self._rng_lock:
+            return max(0.0, self._latency(self._rng))
+
+    def _count(self, **deltas: int) -> None:
+        with self._stats.lock:
+            for key, delta in deltas.items():
+                setattr(self._stats, key, getattr(self._stats, key) + delta)
+            self._stats.peak_in_flight = max(self._stats.peak_in_flight, self._stats.in_flight)
+            self._stats.peak_queued = max(self._stats.peak_queued, self._stats.queued)
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                path = self.path.rstrip('/')
+                if path.endswith('/models'):
+                    self._send_json(200, {
+                        'object': 'list',
+                        'data': [{'id': server.config.model, 'object': 'model', 'owned_by': 'mock'}],
+                    })
+                elif path.endswith('/stats'):
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_error(404, f"unknown path: {self.path}")
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length)
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_error(404, f"unknown path: {self.path}")
+                    return
+                try:
+                    body = json.loads(raw)
+                    messages = body['messages']
+                except (ValueError, KeyError, TypeError):
+                    self._send_error(400, 'request body must be JSON with "messages"')
+                    return
+                server._count(requests=1)
+                server._complete(self, body, messages)
+
+            def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+                self._send_json(status, {'error': {'message': message, 'code': status}}, headers)
+
+        return Handler
+
+    def _complete(self, handler: Any, body: Dict[str, Any], messages: List[Dict[str, Any]]) -> None:
+        config = self.config
+        if self._random() < config.error_rate:
+            self._count(errors_injected=1)
+            with self._rng_lock:
+                status = self._rng.choice(config.error_statuses)
+            handler._send_error(status, 'injected error', {'Retry-After': '1'} if status in (429, 503) else None)
+            return
+        if self._random() < config.timeout_rate:
+            # Hold the connection without answering until the client gives up or we stop.
+            self._count(timeouts_injected=1)
+            self._stopping.wait(config.hang_seconds)
+            handler.close_connection = True
+            return
+
+        if self._slots is not None:
+            if config.reject_when_busy:
+                if not self._slots.acquire(blocking=False):
+                    self._count(rejected_busy=1)
+                    handler._send_error(503, 'all slots are busy', {'Retry-After': '1'})
+                    return
+            else:
+                self._count(queued=1)
+                self._slots.acquire()
+                self._count(queued=-1)
+        self._count(in_flight=1)
+        try:
+            self._generate(handler, body, messages)
+        finally:
+            self._count(in_flight=-1)
+            if self._slots is not None:
+                self._slots.release()
+
+    def _generate(self, handler: Any, body: Dict[str, Any], messages: List[Dict[str, Any]]) -> None:
+        config = self.config
+        prompt = '\n'.join(str(message.get('content', '')) for message in messages)
+        prompt_tokens = _estimate_tokens(prompt, config.chars_per_token)
+        content = canned_answer(
+            str(messages[-1].get('content', '')),
+            max(0, config.findings_per_file),
+            structured=body.get('response_format') is not None,
+        )
+        finish_reason = 'stop'
+        max_tokens = body.get('max_tokens')
+        if isinstance(max_tokens, int) and max_tokens > 0:
+            limit = int(max_tokens * config.chars_per_token)
+            if len(content) > limit:
+                content, finish_reason = content[:limit], 'length'
+        completion_tokens = _estimate_tokens(content, config.chars_per_token)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        }
+
+        delay = self._sample_latency()
+        if config.prompt_tokens_per_second > 0:
+            delay += prompt_tokens / config.prompt_tokens_per_second
+        if self._stopping.wait(delay):
+            return
+        generation_time = completion_tokens / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        if not body.get('stream'):
+            if self._stopping.wait(generation_time):
+                return
+            handler._send_json(200, {
+                'id': f"chatcmpl-mock-{self._stats.requests}",
+                'object': 'chat.completion',
+                'model': config.model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': finish_reason,
+                }],
+                'usage': usage,
+            })
+            self._count(completed=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            return
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.end_headers()
+        handler.close_connection = True
+        # Roughly four tokens per event, paced to the configured generation speed.
+        piece = max(1, int(4 * config.chars_per_token))
+        pieces = [content[i:i + piece] for i in range(0, len(content), piece)] or ['']
+        pause = generation_time / len(pieces)
+        try:
+            for text in pieces:
+                if self._stopping.wait(pause):
+                    return
+                self._write_event(handler, {'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}]})
+            self._write_event(handler, {
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish_reason}],
+                'usage': usage,
+            })
+            handler.wfile.write(b'data: [DONE]\n\n')
+            handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream (hedging, runaway output); stop generating.
+            self._count(disconnected=1)
+            return
+        self._count(completed=1, streamed=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    @staticmethod
+    def _write_event(handler: Any, payload: Dict[str, Any]) -> None:
+        handler.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+        handler.wfile.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='負荷試験・ベンチマーク用の OpenAI 互換モックLLMサーバー')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けるアドレス (デフォルト: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='待ち受けるポート (デフォルト: 8000)')
+    parser.add_argument('--model', default='mock-model', help='/v1/models で返すモデル名 (デフォルト: mock-model)')
+    parser.add_argument(
+        '--latency',
+        default='0',
+        help='生成開始までの遅延（秒）の分布。例: 0.5, uniform:0.2:1.5, exponential:0.8, lognormal:0.8:0.5 (デフォルト: 0)'
+    )
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='生成速度（トークン/秒）。0で即時 (デフォルト: 0)')
+    parser.add_argument(
+        '--prompt-tokens-per-second', type=float, default=0.0,
+        help='プロンプト処理速度（トークン/秒）。0で省略 (デフォルト: 0)'
+    )
+    parser.add_argument('--slots', type=int, default=0, help='同時に生成するリクエスト数。超えた分は待たせる。0で無制限 (デフォルト: 0)')
+    parser.add_argument('--reject-when-busy', action='store_true', help='スロットが埋まっている場合は待たせずに503を返す')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='エラーを返すリクエストの割合 (デフォルト: 0)')
+    parser.add_argument(
+        '--error-status', type=int, action='append', dest='error_statuses',
+        help='注入するエラーのHTTPステータス（複数指定可、デフォルト: 503）'
+    )
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='応答を返さずに放置するリクエストの割合 (デフォルト: 0)')
+    parser.add_argument('--hang-seconds', type=float, default=600.0, help='放置するリクエストを保持する時間（秒） (デフォルト: 600)')
+    parser.add_argument('--findings-per-file', type=int, default=1, help='ファイル（チャンク）ごとに返す指摘の数 (デフォルト: 1)')
+    parser.add_argument('--seed', type=int, help='遅延・エラー注入の乱数シード')
+    args = parser.parse_args()
+
+    try:
+        parse_latency(args.latency)
+    except ValueError as exc:
+        parser.error(str(exc))
+    server = MockLLMServer(MockServerConfig(
+        host=args.host,
+        port=args.port,
+        model=args.model,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        slots=args.slots,
+        reject_when_busy=args.reject_when_busy,
+        error_rate=args.error_rate,
+        error_statuses=tuple(args.error_statuses or (503,)),
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        findings_per_file=args.findings_per_file,
+        seed=args.seed,
+    ))
+    print(f"モックLLMサーバーを起動しました: {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"統計: {json.dumps(server.stats(), ensure_ascii=False)}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
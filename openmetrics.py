@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+Labels = Dict[str, str]
+
+
+@dataclass
+class MetricFamily:
+    """One metric with its samples; ``kind`` is ``gauge``, ``counter`` or ``histogram``.
+
+    Counter names end in ``_total``. Histogram samples are given as ``buckets``
+    (upper bound, non-cumulative count) plus ``sum``.
+    """
+
+    name: str
+    kind: str
+    help: str
+    samples: List[Tuple[Labels, float]] = field(default_factory=list)
+    buckets: Sequence[Tuple[float, int]] = ()
+    sum: float = 0.0
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    pairs = (f'{key}="{_escape(str(value))}"' for key, value in sorted(labels.items()))
+    return '{' + ','.join(pairs) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(families: Sequence[MetricFamily]) -> str:
+    """Render metric families in the Prometheus text format read by node-exporter."""
+
+    lines: List[str] = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        if family.kind == 'histogram':
+            cumulative = 0
+            for bound, count in family.buckets:
+                cumulative += count
+                lines.append(f"{family.name}_bucket{_format_labels({'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{family.name}_sum {_format_value(family.sum)}")
+            lines.append(f"{family.name}_count {cumulative}")
+            continue
+        for labels, value in family.samples:
+            lines.append(f"{family.name}{_format_labels(labels)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+@dataclass
+class TextfileExporter:
+    """Background thread that rewrites a metrics textfile every ``interval`` seconds.
+
+    The file is replaced atomically so node-exporter's textfile collector never reads a
+    half-written file; it should end in ``.prom`` and live in the collector's directory.
+    """
+
+    path: Path
+    collect: Callable[[], List[MetricFamily]]
+    interval: float = 15.0
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path = Path(self.path)
+
+    def start(self) -> None:
+        self.write()
+        self._thread = threading.Thread(target=self._loop, name='metrics-textfile', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread and write the final values."""
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        self.write()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self) -> None:
+        try:
+            text = render(self.collect())
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            with tmp_path.open('w', encoding='utf-8') as handle:
+                handle.write(text)
+            os.replace(tmp_path, self.path)
+        except Exception as exc:  # A broken exporter must never stop a review run.
+            print(f"メトリクスファイルの書き込みに失敗しました: {exc}", file=sys.stderr)
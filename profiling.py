@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import io
+import pstats
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+@dataclass
+class _StageProfile:
+    wall_s: float = 0.0
+    llm_wait_s: float = 0.0
+    profiles: List[cProfile.Profile] = field(default_factory=list)
+
+
+@dataclass
+class StageProfiler:
+    """cProfile per graph node, written as ``<stage>.prof`` dumps plus a text summary.
+
+    Profiles measure CPU time of the profiled thread (``time.thread_time``), so time spent
+    blocked on the LLM server does not drown out hotspots in our own code; that wait is
+    reported separately from ``llm_wait_clock``, a cumulative seconds counter.
+    Worker threads join the profile of the running stage through ``worker()``.
+    """
+
+    output_dir: Path
+    llm_wait_clock: Callable[[], float]
+    top_n: int = 30
+    stages: Dict[str, _StageProfile] = field(default_factory=dict)
+    _active: Optional[str] = field(default=None, init=False, repr=False)
+    _stage_thread: Optional[int] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def run_stage(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        stage = self.stages.setdefault(name, _StageProfile())
+        profile = cProfile.Profile(time.thread_time)
+        self._active, self._stage_thread = name, threading.get_ident()
+        started = time.monotonic()
+        wait_before = self.llm_wait_clock()
+        profile.enable()
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            stage.wall_s += time.monotonic() - started
+            stage.llm_wait_s += self.llm_wait_clock() - wait_before
+            stage.profiles.append(profile)
+            self._active = self._stage_thread = None
+
+    @contextlib.contextmanager
+    def worker(self) -> Iterator[None]:
+        """Profile the calling worker thread into the currently running stage."""
+
+        name = self._active
+        if name is None or threading.get_ident() == self._stage_thread:
+            yield
+            return
+        profile = cProfile.Profile(time.thread_time)
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler, and it already sees every thread.
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self.stages[name].profiles.append(profile)
+
+    def write(self, summary_path: Path) -> Dict[str, Dict[str, float]]:
+        """Dump one ``.prof`` file per stage and a top-N summary; return per-stage totals."""
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        totals: Dict[str, Dict[str, float]] = {}
+        report = io.StringIO()
+        for name, stage in self.stages.items():
+            stats = pstats.Stats(stage.profiles[0], stream=report)
+            for profile in stage.profiles[1:]:
+                stats.add(profile)
+            dump_path = self.output_dir / f"{name}.prof"
+            stats.dump_stats(str(dump_path))
+            totals[name] = {
+                'wall_s': round(stage.wall_s, 3),
+                'cpu_s': round(stats.total_tt, 3),
+                'llm_wait_s': round(stage.llm_wait_s, 3),
+                'threads': len(stage.profiles),
+            }
+            report.write(
+                f"=== {name}: wall {stage.wall_s:.2f}s, CPU {stats.total_tt:.2f}s, "
+                f"LLM wait {stage.llm_wait_s:.2f}s ({len(stage.profiles)} threads) — {dump_path.name}\n"
+            )
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top_n)
+        summary_path.write_text(report.getvalue(), encoding='utf-8')
+        return totals
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+@dataclass
+class ResponseCache:
+    """Content-addressed on-disk cache of raw LLM completions with LRU eviction."""
+
+    cache_dir: Path
+    max_bytes: int = 512 * 1024 * 1024
+    hits: int = 0
+    misses: int = 0
+    _entries: Dict[str, Tuple[int, float]] = field(default_factory=dict, init=False, repr=False)
+    _total_bytes: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.cache_dir = Path(self.cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._scan()
+
+    def _scan(self) -> None:
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._entries[path.stem] = (stat.st_size, stat.st_mtime)
+            self._total_bytes += stat.st_size
+
+    @staticmethod
+    def make_key(
+        *,
+        prompt_hash: str,
+        model: str,
+        system_prompt: str,
+        params: Dict[str, object],
+    ) -> str:
+        material = json.dumps(
+            {
+                "prompt_hash": prompt_hash,
+                "model": model,
+                "system_prompt": system_prompt,
+                "params": params,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path_for(key)
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+            content = data["content"]
+        except (OSError, ValueError, KeyError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        now = time.time()
+        try:
+            # The file mtime doubles as the LRU timestamp so recency survives restarts.
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries[key] = (self._entries[key][0], now)
+        return content
+
+    def put(self, key: str, content: str, metadata: Optional[Dict[str, object]] = None) -> None:
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "content": content,
+            "metadata": metadata or {},
+            "ts": datetime.now(timezone.utc).isoformat(),
+        }
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(payload, handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        size = path.stat().st_size
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous:
+                self._total_bytes -= previous[0]
+            self._entries[key] = (size, time.time())
+            self._total_bytes += size
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                self._path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            del self._entries[key]
+            self._total_bytes -= size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict
+
+# JSON schemas for the answers requested by the single-file and batch review prompts.
+# Batch answers are wrapped in an object because several servers only accept an object
+# at the root of a structured-output schema.
+
+REVIEW_ITEM_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "line": {"type": "integer"},
+        "severity": {"type": "string", "enum": ["error", "warning", "info"]},
+        "risk_score": {"type": "integer", "minimum": 1, "maximum": 10},
+        "message": {"type": "string"},
+    },
+    "required": ["line", "severity", "risk_score", "message"],
+    "additionalProperties": False,
+}
+
+FILE_REVIEW_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "reviews": {"type": "array", "items": REVIEW_ITEM_SCHEMA},
+        "summary": {"type": "string"},
+    },
+    "required": ["reviews", "summary"],
+    "additionalProperties": False,
+}
+
+BATCH_REVIEW_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "files": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "file": {"type": "string"},
+                    "reviews": {"type": "array", "items": REVIEW_ITEM_SCHEMA},
+                },
+                "required": ["file", "reviews"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["files"],
+    "additionalProperties": False,
+}
+
+SCHEMAS = {
+    "file_review": FILE_REVIEW_SCHEMA,
+    "batch_review": BATCH_REVIEW_SCHEMA,
+}
+
+
+def response_format_for(shape: str) -> Dict[str, Any]:
+    """Return an OpenAI-compatible ``response_format`` constraining output to ``shape``."""
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": shape,
+            "strict": True,
+            "schema": copy.deepcopy(SCHEMAS[shape]),
+        },
+    }
@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
+import copy
 import hashlib
 import json
+import math
+import queue
+import re
 import subprocess
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any, Optional, TypedDict
+from typing import List, Dict, Any, Deque, Optional, Tuple, TypedDict, Union
 import requests
 import fnmatch
 
@@ -18,10 +27,44 @@ except ImportError as exc:
 
 from chunker import Chunk, generate_chunks
 from coverage import CoverageLedger, CoverageTarget
+from findings_store import FindingsStore
+from json_recovery import recover_json
+from llm_client import (
+    CircuitBreaker,
+    Completion,
+    Endpoint,
+    HedgePolicy,
+    JsonStreamMonitor,
+    LLMClient,
+    LLMResponseError,
+    RequestCancel,
+    RetryPolicy,
+    StreamAbortedError,
+    is_overload_error,
+    is_response_format_rejection,
+    parse_retry_after,
+    take_connect_time,
+)
+from flow_control import AdaptiveConcurrencyLimiter, DeadlineExceeded, DeadlineGate, TokenBucketRateLimiter
+from metrics import RunMetrics, TimingRecorder
+from openmetrics import MetricFamily, TextfileExporter
+from profiling import StageProfiler
+from tracing import TraceRecorder
+from response_cache import ResponseCache
+from response_schema import response_format_for
+from token_calibration import DEFAULT_CHARS_PER_TOKEN, TokenCalibration
 
 MAX_FILES_PER_BATCH = 5  # Maximum number of files to batch together
 BATCH_TOKEN_RATIO = 0.3  # Use 30% of context length for batch content (leaving room for prompt overhead)
 API_TIMEOUT_SECONDS = 300  # 5 minutes timeout for LLM API calls
+LLM_TEMPERATURE = 0.1
+MIN_COMPLETION_TOKENS = 256  # Never ask for fewer tokens than this, even when the prompt is huge
+COMPLETION_TOKEN_MARGIN = 256  # Slack between prompt estimate + max_tokens and the context length
+COMPLETION_TOKEN_STEP = 256  # max_tokens sized from the context is rounded down to this step
+BISECT_MIN_LINES = 20  # Failed chunks are halved until a half would be shorter than this
+THROUGHPUT_WINDOW_SECONDS = 300  # Window of the rolling throughput in the metrics textfile
+REQUEST_TIMING_PHASES = ('queue', 'connect', 'ttft', 'generation', 'http', 'call')
+SCHEDULE_CALL_COST_TOKENS = 1000  # Fixed per-request cost (prompt boilerplate + generation) when ordering work
 
 
 class ReviewerState(TypedDict, total=False):
@@ -32,12 +75,14 @@ class ReviewerState(TypedDict, total=False):
     processed_files: int
     results: List[Dict[str, Any]]
     repo_overview_entries: List[Dict[str, Any]]
+    duplicates: Dict[str, List[str]]
+    duplicate_files: int
 
 
 class CodeReviewer:
     def __init__(
         self,
-        api_url: str,
+        api_url: Union[str, List[str]],
         model: str,
         context_length: int,
         output_path: str,
@@ -52,8 +97,43 @@ class CodeReviewer:
         repo_overview_tokens: int = 0,
         repo_overview_lines: int = 20,
         fail_on_miss: bool = False,
+        concurrency: int = 1,
+        http_pool_size: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_mb: int = 512,
+        use_cache: bool = True,
+        incremental: bool = False,
+        stream: bool = False,
+        max_completion_tokens: int = 4096,
+        max_continuations: int = 2,
+        max_retries: int = 3,
+        retry_backoff: float = 2.0,
+        retry_backoff_max: float = 60.0,
+        circuit_breaker_threshold: int = 5,
+        circuit_breaker_cooldown: float = 30.0,
+        endpoint_eject_after: int = 3,
+        health_check_interval: float = 30.0,
+        adaptive_concurrency: bool = False,
+        min_concurrency: int = 1,
+        max_tokens_per_minute: int = 0,
+        max_requests_per_minute: int = 0,
+        prompt_layout: str = 'standard',
+        priority_patterns: Optional[List[str]] = None,
+        time_budget: Optional[float] = None,
+        structured_output: bool = False,
+        bisect_failures: bool = True,
+        hedge_percentile: float = 0.0,
+        hedge_min_samples: int = 10,
+        dedupe: bool = True,
+        metrics_textfile: Optional[str] = None,
+        metrics_interval: float = 15.0,
+        profile: bool = False,
+        profile_top: int = 30,
+        trace: bool = False,
     ):
-        self.api_url = api_url.rstrip('/')
+        api_urls = [api_url] if isinstance(api_url, str) else list(api_url)
+        self.api_urls = [url.rstrip('/') for url in api_urls]
+        self.api_url = self.api_urls[0]
         self.model = model
         self.context_length = context_length
         self.output_path = output_path
@@ -68,11 +148,128 @@ class CodeReviewer:
         self.repo_overview_tokens = repo_overview_tokens
         self.repo_overview_lines = repo_overview_lines
         self.fail_on_miss = fail_on_miss
+        self.concurrency = max(1, concurrency)
+        self.stream = stream
+        self.prompt_layout = prompt_layout
+        self.structured_output = structured_output
+        self.bisect_failures = bisect_failures
+        self.dedupe = dedupe
+        self._structured_output_rejected: Optional[str] = None
+        self._parse_stats: Dict[str, Dict[str, int]] = {}
+        self._parse_stats_lock = threading.Lock()
+        self.priority_patterns = list(priority_patterns or [])
+        self.max_completion_tokens = max(MIN_COMPLETION_TOKENS, max_completion_tokens)
+        self.max_continuations = max(0, max_continuations)
+        self.retry_policy = RetryPolicy(
+            max_retries=max(0, max_retries),
+            backoff_base=retry_backoff,
+            backoff_max=retry_backoff_max,
+        )
+        self.concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None
+        if adaptive_concurrency:
+            self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+                max_limit=self.concurrency,
+                min_limit=min_concurrency,
+            )
+        self.rate_limiter = TokenBucketRateLimiter(
+            tokens_per_minute=max_tokens_per_minute,
+            requests_per_minute=max_requests_per_minute,
+        )
+        self.time_budget: Optional[DeadlineGate] = None
+        if time_budget:
+            self.time_budget = DeadlineGate(budget_s=time_budget)
+        self._budget_notice_printed = False
+        self.hedge_policy: Optional[HedgePolicy] = None
+        if hedge_percentile > 0 and len(self.api_urls) > 1:
+            self.hedge_policy = HedgePolicy(
+                percentile=min(hedge_percentile, 100.0),
+                min_samples=max(1, hedge_min_samples),
+            )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=circuit_breaker_threshold,
+            cooldown=circuit_breaker_cooldown,
+            debug=debug,
+        )
+        self.client = LLMClient(
+            api_urls=self.api_urls,
+            api_key=api_key,
+            # Cancelled non-streaming hedges keep their connection until the server answers.
+            pool_size=http_pool_size or self.concurrency * (2 if self.hedge_policy else 1),
+            debug=debug,
+            eject_after=endpoint_eject_after,
+            health_check_interval=health_check_interval,
+        )
         self.results = []
         self.repo_overview_entries: List[Dict[str, Any]] = []
         self.commit_sha = self._resolve_commit_sha()
         self.coverage = CoverageLedger(self.code_dir, self.commit_sha)
+        self.metrics = RunMetrics(self.coverage.coverage_dir / "metrics.json", self.commit_sha)
+        self.request_timings = TimingRecorder()
+        self.node_timings: Dict[str, float] = {}
+        self.profiler: Optional[StageProfiler] = None
+        if profile:
+            self.profiler = StageProfiler(
+                self.coverage.coverage_dir / "profile",
+                llm_wait_clock=lambda: self.request_timings.total_ms('http') / 1000,
+                top_n=max(1, profile_top),
+            )
+        self.tracer = TraceRecorder(enabled=trace)
+        self.token_calibration = TokenCalibration(self.coverage.coverage_dir / "token-calibration.json")
+        # Ratios are frozen for the whole run so batching and chunk boundaries stay
+        # deterministic; what this run learns is only used from the next run on.
+        self.token_ratios = self.token_calibration.ratios()
+        self.cache: Optional[ResponseCache] = None
+        if use_cache:
+            self.cache = ResponseCache(
+                Path(cache_dir) if cache_dir else self.code_dir / ".llm-cache",
+                max_bytes=max(0, cache_max_mb) * 1024 * 1024,
+            )
+        self.findings: Optional[FindingsStore] = None
+        if incremental:
+            self.findings = FindingsStore(
+                self.coverage.coverage_dir / "findings.jsonl",
+                # Every setting that shapes the prompt or the answer; changing one re-reviews.
+                config_hash=FindingsStore.make_config_hash({
+                    'model': self.model,
+                    'system_prompt': self._system_message(),
+                    'language': self.language,
+                    'review_focus': sorted(self.review_focus),
+                    'temperature': LLM_TEMPERATURE,
+                    'prompt_layout': self.prompt_layout,
+                    'repo_overview_tokens': self.repo_overview_tokens,
+                    'context_length': self.context_length,
+                    'batch_threshold': self.batch_threshold,
+                    'batch_token_ratio': BATCH_TOKEN_RATIO,
+                    'max_files_per_batch': MAX_FILES_PER_BATCH,
+                    'structured_output': self.structured_output,
+                    'max_completion_tokens': self.max_completion_tokens,
+                    'dedupe': self.dedupe,
+                }),
+            )
         self.batch_counter = 0
+        self._batch_counter_lock = threading.Lock()
+        self._progress_lock = threading.Lock()
+        self._prompt_usage = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'reported': 0}
+        self._prompt_usage_lock = threading.Lock()
+        self._run_progress: Dict[str, Any] = {
+            'batches_total': 0,
+            'batches_done': 0,
+            'in_flight': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'retries': 0,
+            'statuses': {},
+            'last_progress': None,
+        }
+        self._run_progress_lock = threading.Lock()
+        self.metrics_exporter: Optional[TextfileExporter] = None
+        if metrics_textfile:
+            self.metrics_exporter = TextfileExporter(
+                Path(metrics_textfile), self._collect_openmetrics, interval=max(1.0, metrics_interval)
+            )
+        self._throughput_samples: Deque[Tuple[float, int, int]] = deque()
+        self._started_at = time.time()
+        self._finished = False
         
         self.supported_extensions = {
             '.py': 'Python',
@@ -147,6 +344,31 @@ class CodeReviewer:
                 files.append(file_path)
         return sorted(files)
 
+    def find_duplicates(self, files: List[Path]) -> Tuple[List[Path], Dict[str, List[str]]]:
+        """Group files with byte-identical content.
+
+        Returns the files to review, keeping the first path of every group as its
+        representative, and the relative paths of the other copies per representative.
+        """
+
+        representatives: List[Path] = []
+        first_by_hash: Dict[str, str] = {}
+        duplicates: Dict[str, List[str]] = {}
+        for file_path in files:
+            try:
+                digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+            except OSError:
+                # Unreadable files are reviewed (and reported) on their own.
+                representatives.append(file_path)
+                continue
+            relative_path = str(file_path.relative_to(self.code_dir))
+            representative = first_by_hash.setdefault(digest, relative_path)
+            if representative == relative_path:
+                representatives.append(file_path)
+            else:
+                duplicates.setdefault(representative, []).append(relative_path)
+        return representatives, duplicates
+
     def build_repo_overview(self, files: List[Path]):
         if self.repo_overview_tokens <= 0:
             return
@@ -175,7 +397,7 @@ class CodeReviewer:
             overview_entries.append({
                 'path': file_path,
                 'text': entry_text,
-                'tokens': self.estimate_tokens(entry_text)
+                'tokens': self.estimate_tokens(entry_text, file_path.suffix)
             })
 
         overview_entries.sort(key=lambda x: str(x['path']))
@@ -273,8 +495,7 @@ class CodeReviewer:
             
             for file_path in dir_files:
                 try:
-                    content = file_path.read_text(encoding='utf-8')
-                    file_tokens = self.estimate_tokens(content)
+                    file_tokens = self.estimate_file_tokens(file_path)
                     
                     if file_tokens > self.batch_threshold:
                         if current_batch:
@@ -307,8 +528,30 @@ class CodeReviewer:
         
         return batches
     
-    def estimate_tokens(self, text: str) -> int:
-        return len(text) // 4
+    def estimate_tokens(self, text: str, suffix: Optional[str] = None) -> int:
+        """Estimate tokens with the calibrated ratio for ``suffix`` (code) or the review language."""
+
+        ratio = self.token_ratios.get(suffix) if suffix else None
+        if ratio is None:
+            ratio = self.token_ratios.get(f'text:{self.language}', DEFAULT_CHARS_PER_TOKEN)
+        return int(len(text) / ratio)
+
+    def estimate_file_tokens(self, file_path: Path) -> int:
+        """Estimate a source file as ``batch_files`` sizes it; raises if it cannot be read."""
+
+        return self.estimate_tokens(file_path.read_text(encoding='utf-8'), file_path.suffix)
+
+    def _estimate_prompt_tokens(self, text: str, code_chars: Optional[Dict[str, int]] = None) -> int:
+        """Estimate a prompt whose code portions (chars per extension) use their own ratios."""
+
+        if not code_chars:
+            return self.estimate_tokens(text)
+        text_ratio = self.token_ratios.get(f'text:{self.language}', DEFAULT_CHARS_PER_TOKEN)
+        other_chars = max(0, len(text) - sum(code_chars.values()))
+        tokens = other_chars / text_ratio
+        for suffix, chars in code_chars.items():
+            tokens += chars / self.token_ratios.get(suffix, text_ratio)
+        return int(tokens)
 
     def _resolve_commit_sha(self) -> Optional[str]:
         try:
@@ -326,16 +569,24 @@ class CodeReviewer:
             return None
 
     def _next_batch_id(self) -> int:
-        self.batch_counter += 1
-        return self.batch_counter
+        with self._batch_counter_lock:
+            self.batch_counter += 1
+            return self.batch_counter
     
     def split_file_content(self, content: str, file_path: Path) -> List[Chunk]:
         relative_path = str(file_path.relative_to(self.code_dir))
+        extra: Dict[str, Any] = {}
+        if file_path.suffix in self.token_ratios:
+            line_count = max(1, len(content.splitlines()))
+            tokens_per_line = self.estimate_tokens(content, file_path.suffix) / line_count
+            # Round up to half a token so the chunk size only changes in coarse steps.
+            extra['tokens_per_line'] = max(1.0, math.ceil(tokens_per_line * 2) / 2)
         return generate_chunks(
             content=content,
             file_path=file_path,
             relative_path=relative_path,
             context_length=self.context_length,
+            **extra,
         )
     
     def get_focus_instructions(self) -> str:
@@ -375,11 +626,17 @@ class CodeReviewer:
     def normalize_reviews(self, reviews: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         return [self.normalize_review_entry(review) for review in reviews]
 
-    def append_result(self, file_identifier: str, reviews: List[Dict[str, Any]]):
+    def append_result(
+        self,
+        file_identifier: str,
+        reviews: List[Dict[str, Any]],
+        results: Optional[List[Dict[str, Any]]] = None,
+    ):
         normalized_identifier = str(file_identifier)
         normalized_reviews = self.normalize_reviews(reviews)
+        target = self.results if results is None else results
         if normalized_reviews:
-            self.results.append({
+            target.append({
                 'file': normalized_identifier,
                 'reviews': normalized_reviews
             })
@@ -393,51 +650,47 @@ class CodeReviewer:
     ) -> str:
         language = self.supported_extensions.get(file_path.suffix, 'Unknown')
         repo_overview = self.get_repo_overview_context(
-            [file_path], repo_overview_entries=repo_overview_entries
+            None if self.prompt_layout == 'prefix-cache' else [file_path],
+            repo_overview_entries=repo_overview_entries,
         )
 
         if self.language == 'ja':
-            prompt = f"""あなたは{language}とROS2開発に精通したエキスパートコードレビュアーです。
+            header = f"""あなたは{language}とROS2開発に精通したエキスパートコードレビュアーです。
 以下のコードをレビューし、具体的で実行可能なフィードバックを提供してください。
 
 ファイル: {file_path.relative_to(self.code_dir)}
 言語: {language}
 """
         else:
-            prompt = f"""You are an expert code reviewer specializing in {language} and ROS2 development.
+            header = f"""You are an expert code reviewer specializing in {language} and ROS2 development.
 Review the following code and provide specific, actionable feedback.
 
 File: {file_path.relative_to(self.code_dir)}
 Language: {language}
 """
 
-        if repo_overview:
-            prompt += f"\n{repo_overview}\n"
-
+        location = ""
         if chunk_info:
             start_line = getattr(chunk_info, 'start_line', None)
             end_line = getattr(chunk_info, 'end_line', None)
             chunk_id = getattr(chunk_info, 'chunk_id', None)
             if start_line is not None and end_line is not None:
                 if self.language == 'ja':
-                    prompt += f"行: {start_line}-{end_line}\n"
+                    location += f"行: {start_line}-{end_line}\n"
                 else:
-                    prompt += f"Lines: {start_line}-{end_line}\n"
+                    location += f"Lines: {start_line}-{end_line}\n"
             if chunk_id:
-                prompt += f"Chunk ID: {chunk_id}\n"
-        
-        prompt += f"""
+                location += f"Chunk ID: {chunk_id}\n"
+
+        code_block = f"""
 コード:
 ```
 {content}
 ```
-
-{self.get_focus_instructions()}
-
 """
-        
+
         if self.language == 'ja':
-            prompt += """以下の正確なJSON形式でのみ応答してください:
+            schema = """以下の正確なJSON形式でのみ応答してください:
 {
   "reviews": [
     {"line": <行番号>, "severity": "error|warning|info", "risk_score": <1から10の整数>, "message": "詳細なメッセージ"},
@@ -450,7 +703,7 @@ Language: {language}
 行番号を正確に指定し、明確で実行可能なフィードバックを提供してください。
 すべてのメッセージは日本語で記述してください。"""
         else:
-            prompt += """Respond ONLY with a valid JSON object in this exact format:
+            schema = """Respond ONLY with a valid JSON object in this exact format:
 {
   "reviews": [
     {"line": <line_number>, "severity": "error|warning|info", "risk_score": <integer 1-10>, "message": "detailed message"},
@@ -461,62 +714,185 @@ Language: {language}
 
 The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix immediately).
 Be specific about line numbers and provide clear, actionable feedback."""
-        
+
+        if self.prompt_layout == 'prefix-cache':
+            return self._shared_prompt_prefix(repo_overview, schema) + header + location + code_block
+
+        prompt = header
+        if repo_overview:
+            prompt += f"\n{repo_overview}\n"
+        prompt += location
+        prompt += code_block
+        prompt += f"""
+{self.get_focus_instructions()}
+
+"""
+        prompt += schema
         return prompt
-    
-    def call_llm(self, prompt: str, ledger_files: List[Dict[str, object]]) -> Optional[Dict]:
-        system_message = self.system_prompt if self.system_prompt else (
+
+    def _shared_prompt_prefix(self, repo_overview: str, schema: str) -> str:
+        """Build the request-independent head of a prefix-cache layout prompt.
+
+        Everything here is byte-identical across requests of the same kind, so servers with
+        prefix (KV) caching only prefill the file-specific tail that follows.
+        """
+
+        prefix = f"{repo_overview}\n\n" if repo_overview else ""
+        return f"""{prefix}{self.get_focus_instructions()}
+{schema}
+
+"""
+
+    def _system_message(self) -> str:
+        return self.system_prompt if self.system_prompt else (
             "あなたは優秀なコードレビュアーです。" if self.language == 'ja'
             else "You are an expert code reviewer."
         )
 
-        headers = {}
-        if self.api_key:
-            headers['Authorization'] = f'Bearer {self.api_key}'
+    def _record_replay(self, ledger_files: List[Dict[str, object]]) -> None:
+        if self.debug:
+            paths = ", ".join(str(entry.get('path')) for entry in ledger_files)
+            print(f"[DEBUG] 前回の指摘を再利用（LLM呼び出しを省略）: {paths}", file=sys.stderr)
+        self._append_ledger(
+            files=ledger_files,
+            model=self.model,
+            api_url=self.api_url,
+            max_context=self.context_length,
+            prompt_hash="",
+            prompt_tokens=0,
+            completion_tokens=0,
+            status='ok',
+            cache='replay',
+            attempts=0,
+        )
+
+    def _append_ledger(self, **record: Any) -> None:
+        files = record.get('files') or []
+        with self.tracer.span('ledger write', 'ledger', status=record.get('status'), files=len(files)):
+            self.coverage.append_record(**record)
+
+    def _store_findings(self, entry: Dict[str, object], reviews: List[Dict[str, Any]]) -> None:
+        if self.findings is None:
+            return
+        self.findings.store(entry, reviews, model=self.model, commit=self.commit_sha)
 
-        prompt_tokens = self.estimate_tokens(prompt)
+    def call_llm(
+        self,
+        prompt: str,
+        ledger_files: List[Dict[str, object]],
+        code_chars: Optional[Dict[str, int]] = None,
+        response_shape: str = 'file_review',
+        outcome: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict]:
+        """Send one review request and return the parsed answer, or None on failure.
+
+        ``outcome`` (if given) receives a ``failure`` kind so callers can decide whether
+        splitting the request could help. An answer salvaged from truncated output is
+        returned, but the ledger entries it does not fully answer are listed in
+        ``outcome['missing']`` and not counted as covered.
+        """
+        system_message = self._system_message()
+
+        prompt_tokens = self._estimate_prompt_tokens(prompt, code_chars)
         prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
         completion_tokens = 0
         status = 'error'
         error_message: Optional[str] = None
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+        sampling_params = {
+            "temperature": LLM_TEMPERATURE,
+            "max_tokens": self._completion_budget(
+                messages, prompt_tokens + self.estimate_tokens(system_message)
+            ),
+        }
+        # Once the server has rejected response_format, later requests go out free-form.
+        response_format = (
+            response_format_for(response_shape)
+            if self.structured_output and self._structured_output_rejected is None
+            else None
+        )
+        continuations = 0
+        recovered = False
+        budget_cut = False
+        missing_files: List[Dict[str, object]] = []
+        cache_key: Optional[str] = None
+        cache_state: Optional[str] = None
+        timing: Dict[str, float] = {}
+        call_info: Dict[str, Any] = {'attempts': 0, 'backoff_s': 0.0, 'api_url': self.api_url}
+        payload = {"model": self.model, "messages": messages, **sampling_params}
+        if response_format is not None:
+            payload["response_format"] = response_format
+        if self.cache is not None:
+            cache_key = self._cache_key(prompt_hash, system_message, payload)
 
         if self.debug:
-            print(f"[DEBUG] API URL: {self.api_url}/chat/completions", file=sys.stderr)
             print(f"[DEBUG] Model: {self.model}", file=sys.stderr)
             print(f"[DEBUG] プロンプト長: {prompt_tokens} トークン", file=sys.stderr)
 
         parsed: Optional[Dict[str, Any]] = None
+        cached_content = self.cache.get(cache_key) if self.cache is not None and cache_key else None
+        budget_cost = prompt_tokens + SCHEDULE_CALL_COST_TOKENS
+        if cached_content is None and not self._admit_within_budget(budget_cost, ledger_files):
+            if outcome is not None:
+                outcome['failure'] = 'time_budget'
+            return None
+        failure: Dict[str, Any] = {'failure': 'other'}
+        call_started = time.monotonic()
 
         try:
-            response = requests.post(
-                f"{self.api_url}/chat/completions",
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 2000
-                },
-                headers=headers,
-                timeout=API_TIMEOUT_SECONDS
-            )
-
-            if self.debug:
-                print(f"[DEBUG] LLM応答ステータス: {response.status_code}", file=sys.stderr)
-
-            if response.status_code != 200:
-                error_message = f"status {response.status_code}: {response.text}"
-                print(f"エラー: APIがステータス {response.status_code} を返しました: {response.text}", file=sys.stderr)
-                return None
-
-            result = response.json()
-            content = result['choices'][0]['message']['content']
+            content = cached_content
+            if content is not None:
+                cache_state = 'hit'
+                if self.debug:
+                    print(f"[DEBUG] LLMキャッシュヒット: {cache_key[:12]}", file=sys.stderr)
+            else:
+                if cache_key:
+                    cache_state = 'miss'
+                request_started = time.monotonic()
+                try:
+                    completion = self._request_completion(payload, timing, call_info)
+                except LLMResponseError as exc:
+                    if response_format is None or not is_response_format_rejection(exc):
+                        raise
+                    self._reject_structured_output(exc)
+                    response_format = None
+                    del payload["response_format"]
+                    # Re-key on the free-form request so it shares entries with later ones.
+                    cached_content = None
+                    if self.cache is not None:
+                        cache_key = self._cache_key(prompt_hash, system_message, payload)
+                        cached_content = self.cache.get(cache_key)
+                    if cached_content is not None:
+                        cache_state = 'hit'
+                        completion = Completion(content=cached_content, finish_reason='stop')
+                    else:
+                        completion = self._request_completion(payload, timing, call_info)
+                content = completion.content
+                while completion.finish_reason == 'length' and continuations < self.max_continuations:
+                    if self.debug:
+                        print(
+                            f"[DEBUG] 応答が max_tokens で切れたため続きを要求します ({continuations + 1}/{self.max_continuations})",
+                            file=sys.stderr,
+                        )
+                    try:
+                        completion, content = self._continue_completion(
+                            messages, content, timing, call_info
+                        )
+                    except DeadlineExceeded:
+                        # Keep the partial answer; what it does not cover is left to the budget.
+                        budget_cut = True
+                        break
+                    continuations += 1
+                if self.time_budget is not None:
+                    self.time_budget.observe(time.monotonic() - request_started, budget_cost)
 
             if self.debug:
                 print(f"[DEBUG] LLM応答プレビュー: {content[:200]}...", file=sys.stderr)
 
+            raw_content = content
             completion_tokens = self.estimate_tokens(content)
             content = content.strip()
             if content.startswith('```json'):
@@ -527,17 +903,75 @@ Be specific about line numbers and provide clear, actionable feedback."""
                 content = content[:-3]
             content = content.strip()
 
-            parsed = json.loads(content)
+            try:
+                parsed = json.loads(content)
+            except json.JSONDecodeError:
+                # Salvage prose-wrapped, comma-damaged or truncated answers instead of
+                # throwing away a paid-for completion.
+                salvaged = recover_json(raw_content)
+                if salvaged is None:
+                    raise
+                parsed = salvaged.value
+                recovered = True
+                print(f"不正な形式のJSON応答を修復して解析しました ({salvaged.method})", file=sys.stderr)
+                if salvaged.partial:
+                    answered = salvaged.complete_files()
+                    missing_files = [entry for entry in ledger_files if entry['path'] not in answered]
+                    if budget_cut:
+                        self.coverage.mark_unreviewed(missing_files, 'time_budget')
+            if cache_state != 'hit':
+                self._count_parse(failed=False, recovered=recovered)
             status = 'ok'
+            # A truncated answer must not be replayed later as if it were complete.
+            if cache_state == 'miss' and cache_key and not missing_files:
+                self.cache.put(cache_key, raw_content, metadata={'model': self.model})
+            usage = call_info.get('usage')
+            if usage and continuations == 0:
+                self.token_calibration.observe(
+                    language=self.language,
+                    prompt_chars=len(system_message) + len(prompt),
+                    prompt_tokens=usage.get('prompt_tokens', 0),
+                    code_chars=code_chars or {},
+                    completion_chars=len(raw_content),
+                    completion_tokens=usage.get('completion_tokens', 0),
+                )
             if self.debug:
                 print(f"[DEBUG] JSON解析成功", file=sys.stderr)
             return parsed
 
+        except DeadlineExceeded as exc:
+            failure = {'failure': 'time_budget'}
+            status = 'time_budget'
+            error_message = str(exc)
+            self._refuse_for_budget(ledger_files)
         except requests.exceptions.Timeout as exc:
+            failure = {'failure': 'timeout'}
             status = 'timeout'
             error_message = f"timeout: {exc}"
             print(f"LLMタイムアウトエラー ({API_TIMEOUT_SECONDS}秒): {exc}", file=sys.stderr)
+        except LLMResponseError as exc:
+            failure = {'failure': 'http_error', 'status_code': exc.status_code}
+            error_message = str(exc)
+            print(f"エラー: APIがステータス {exc.status_code} を返しました: {exc.text}", file=sys.stderr)
+        except StreamAbortedError as exc:
+            failure = {'failure': 'timeout' if exc.reason == 'max_duration' else 'aborted'}
+            if exc.reason == 'max_duration':
+                status = 'timeout'
+            error_message = str(exc)
+            completion_tokens = self.estimate_tokens(exc.content)
+            print(f"ストリーミング応答を中断しました ({exc.reason})", file=sys.stderr)
+            if self.debug:
+                print(f"[DEBUG] 中断時点の内容:\n{exc.content[:500]}", file=sys.stderr)
         except json.JSONDecodeError as exc:
+            if budget_cut:
+                # Not the model's fault: the continuation was refused by the time budget.
+                failure = {'failure': 'time_budget'}
+                status = 'time_budget'
+                self._refuse_for_budget(ledger_files)
+            else:
+                failure = {'failure': 'parse'}
+            if cache_state != 'hit' and not budget_cut:
+                self._count_parse(failed=True)
             error_message = f"json decode: {exc}"
             print(f"JSON解析エラー: {exc}", file=sys.stderr)
             if self.debug and 'content' in locals():
@@ -549,24 +983,696 @@ Be specific about line numbers and provide clear, actionable feedback."""
                 import traceback
                 traceback.print_exc(file=sys.stderr)
         finally:
-            self.coverage.append_record(
-                files=ledger_files,
-                model=self.model,
-                api_url=self.api_url,
-                max_context=self.context_length,
-                prompt_hash=prompt_hash,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                status=status,
-                error_message=error_message,
-            )
+            if call_info['attempts']:
+                self._observe_request_timing(timing, time.monotonic() - call_started)
+            # Like a refusal before the queue, one that never got out of it leaves no record.
+            if status != 'time_budget' or call_info['attempts']:
+                self._record_request_progress(status, call_info, prompt_tokens, completion_tokens)
+                self._append_ledger(
+                    files=ledger_files,
+                    model=self.model,
+                    api_url=call_info['api_url'],
+                    max_context=self.context_length,
+                    prompt_hash=prompt_hash,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    status=status,
+                    error_message=error_message,
+                    cache=cache_state,
+                    timing=timing or None,
+                    continuations=continuations,
+                    attempts=int(call_info['attempts']),
+                    backoff_s=round(call_info['backoff_s'], 3),
+                    usage=call_info.get('usage'),
+                    structured_output=response_format is not None,
+                    recovered=recovered,
+                    hedged=bool(call_info.get('hedged')),
+                    missing_files=missing_files,
+                )
+            if outcome is not None and status != 'ok':
+                outcome.update(failure)
+            elif outcome is not None and missing_files:
+                outcome.update({'failure': 'time_budget' if budget_cut else 'truncated', 'missing': missing_files})
 
         return parsed
+
+    def _add_progress(self, key: str, delta: int) -> None:
+        with self._run_progress_lock:
+            self._run_progress[key] += delta
+
+    def _record_request_progress(
+        self, status: str, call_info: Dict[str, Any], prompt_tokens: int, completion_tokens: int
+    ) -> None:
+        usage = call_info.get('usage') or {}
+        with self._run_progress_lock:
+            progress = self._run_progress
+            progress['statuses'][status] = progress['statuses'].get(status, 0) + 1
+            progress['retries'] += max(0, int(call_info['attempts']) - 1)
+            if call_info['attempts']:
+                progress['prompt_tokens'] += usage.get('prompt_tokens', prompt_tokens)
+                progress['completion_tokens'] += usage.get('completion_tokens', completion_tokens)
+            progress['last_progress'] = time.time()
+
+    def _collect_openmetrics(self) -> List[MetricFamily]:
+        """Current run state as metric families for the ``--metrics-textfile`` exporter."""
+
+        now = time.monotonic()
+        with self._run_progress_lock:
+            progress = dict(self._run_progress, statuses=dict(self._run_progress['statuses']))
+        # Throughput over the last THROUGHPUT_WINDOW_SECONDS, from periodic samples.
+        samples = self._throughput_samples
+        samples.append((now, progress['batches_done'], progress['completion_tokens']))
+        while len(samples) > 2 and now - samples[1][0] >= THROUGHPUT_WINDOW_SECONDS:
+            samples.popleft()
+        oldest = samples[0]
+        elapsed = now - oldest[0]
+        batches_per_minute = (progress['batches_done'] - oldest[1]) * 60 / elapsed if elapsed > 0 else 0.0
+        tokens_per_second = (progress['completion_tokens'] - oldest[2]) / elapsed if elapsed > 0 else 0.0
+
+        prefix = 'llm_reviewer'
+        families = [
+            MetricFamily(f'{prefix}_batches', 'gauge', 'Review batches planned for this run.',
+                         [({}, progress['batches_total'])]),
+            MetricFamily(f'{prefix}_batches_done_total', 'counter', 'Review batches finished.',
+                         [({}, progress['batches_done'])]),
+            MetricFamily(f'{prefix}_batches_remaining', 'gauge', 'Review batches not finished yet.',
+                         [({}, max(0, progress['batches_total'] - progress['batches_done']))]),
+            MetricFamily(f'{prefix}_requests_in_flight', 'gauge', 'LLM requests currently sent and unanswered.',
+                         [({}, progress['in_flight'])]),
+            MetricFamily(f'{prefix}_requests_total', 'counter',
+                         'Review requests by ledger status (ok, error, timeout).',
+                         [({'status': status}, count) for status, count in sorted(progress['statuses'].items())]),
+            MetricFamily(f'{prefix}_retries_total', 'counter', 'LLM request attempts beyond the first.',
+                         [({}, progress['retries'])]),
+            MetricFamily(f'{prefix}_prompt_tokens_total', 'counter',
+                         'Prompt tokens sent (server-reported, estimated otherwise).',
+                         [({}, progress['prompt_tokens'])]),
+            MetricFamily(f'{prefix}_completion_tokens_total', 'counter',
+                         'Completion tokens received (server-reported, estimated otherwise).',
+                         [({}, progress['completion_tokens'])]),
+            MetricFamily(f'{prefix}_throughput_batches_per_minute', 'gauge',
+                         f'Batches finished per minute over the last {THROUGHPUT_WINDOW_SECONDS}s.',
+                         [({}, round(batches_per_minute, 3))]),
+            MetricFamily(f'{prefix}_throughput_completion_tokens_per_second', 'gauge',
+                         f'Completion tokens per second over the last {THROUGHPUT_WINDOW_SECONDS}s.',
+                         [({}, round(tokens_per_second, 3))]),
+            MetricFamily(f'{prefix}_start_time_seconds', 'gauge', 'Unix time the run started.',
+                         [({}, round(self._started_at, 3))]),
+        ]
+        if progress['last_progress'] is not None:
+            families.append(MetricFamily(
+                f'{prefix}_last_progress_time_seconds', 'gauge',
+                'Unix time the last review request finished; alert when it stops moving.',
+                [({}, round(progress['last_progress'], 3))],
+            ))
+        call = self.request_timings.buckets('call')
+        if call is not None:
+            bounds_ms, counts, total_ms = call
+            families.append(MetricFamily(
+                f'{prefix}_request_duration_seconds', 'histogram',
+                'Wall time of review requests including retries.',
+                buckets=list(zip([bound / 1000 for bound in bounds_ms] + [float('inf')], counts)),
+                sum=round(total_ms / 1000, 3),
+            ))
+        families.append(MetricFamily(f'{prefix}_finished', 'gauge', '1 once the run has finished.',
+                                     [({}, 1 if self._finished else 0)]))
+        return families
+
+    def _observe_request_timing(self, timing: Dict[str, float], call_seconds: float) -> None:
+        """Add one logical request to the per-phase latency histograms.
+
+        ``ttft`` and ``generation`` are only known for streamed responses; ``http`` is the
+        time spent in HTTP requests and ``call`` the whole call including retries.
+        """
+
+        for phase in REQUEST_TIMING_PHASES:
+            if phase == 'call':
+                self.request_timings.observe(phase, call_seconds * 1000)
+                continue
+            value = timing.get('total_ms' if phase == 'http' else f'{phase}_ms')
+            if value is not None:
+                self.request_timings.observe(phase, value)
+
+    def _should_bisect(self, outcome: Dict[str, Any]) -> bool:
+        """Whether a smaller request could succeed where this one failed.
+
+        Timeouts, unusable or truncated output and requests the server refused as too large are split;
+        overload, connection problems and the time budget are not, since more and smaller
+        requests would only make those worse.
+        """
+
+        if not self.bisect_failures:
+            return False
+        failure = outcome.get('failure')
+        if failure in ('timeout', 'parse', 'aborted', 'truncated'):
+            return True
+        return failure == 'http_error' and outcome.get('status_code') in (400, 413, 422)
+
+    @staticmethod
+    def _unanswered_reason(outcome: Dict[str, Any]) -> str:
+        """Coverage reason for segments a cut-off answer left out."""
+
+        return 'time_budget' if outcome.get('failure') == 'time_budget' else "answer truncated"
+
+    def _reject_structured_output(self, exc: LLMResponseError) -> None:
+        with self._parse_stats_lock:
+            first = self._structured_output_rejected is None
+            self._structured_output_rejected = f"status {exc.status_code}: {exc.text[:200]}"
+        if first:
+            print(
+                f"サーバーが response_format（JSONスキーマ）を受け付けなかったため、通常のプロンプトに切り替えます: "
+                f"{exc.text[:200]}",
+                file=sys.stderr,
+            )
+
+    def _count_parse(self, failed: bool, recovered: bool = False) -> None:
+        """Count fresh responses per model, JSON parse failures and recovered answers."""
+
+        with self._parse_stats_lock:
+            stats = self._parse_stats.setdefault(
+                self.model, {'responses': 0, 'parse_failures': 0, 'recovered': 0}
+            )
+            stats['responses'] += 1
+            if failed:
+                stats['parse_failures'] += 1
+            if recovered:
+                stats['recovered'] += 1
+
+    def _admit_within_budget(self, cost: int, ledger_files: List[Dict[str, object]]) -> bool:
+        """Check the time budget before starting a new request; mark the segments if refused."""
+
+        if self.time_budget is None or self.time_budget.admits(cost):
+            return True
+        self._refuse_for_budget(ledger_files)
+        return False
+
+    def _refuse_for_budget(self, ledger_files: List[Dict[str, object]]) -> None:
+        self.coverage.mark_unreviewed(ledger_files, 'time_budget')
+        with self._progress_lock:
+            if not self._budget_notice_printed:
+                self._budget_notice_printed = True
+                print(
+                    "時間予算内に終わらない見込みのため、新しいLLMリクエストの開始を停止します"
+                    "（実行中のリクエストは完了まで待機）",
+                    file=sys.stderr,
+                )
+        if self.debug:
+            paths = ", ".join(str(entry.get('path')) for entry in ledger_files)
+            print(f"[DEBUG] 時間予算によりスキップ: {paths}", file=sys.stderr)
+
+    def _completion_budget(
+        self, messages: List[Dict[str, str]], prompt_tokens: Optional[int] = None
+    ) -> int:
+        """Size max_tokens from whatever context is left after the prompt."""
+
+        if prompt_tokens is None:
+            prompt_tokens = sum(self.estimate_tokens(message['content']) for message in messages)
+        remaining = self.context_length - prompt_tokens - COMPLETION_TOKEN_MARGIN
+        # max_tokens is part of the cache key; steps keep it stable while calibration drifts.
+        remaining -= remaining % COMPLETION_TOKEN_STEP
+        return max(MIN_COMPLETION_TOKENS, min(self.max_completion_tokens, remaining))
+
+    def _continue_completion(
+        self,
+        messages: List[Dict[str, str]],
+        content: str,
+        timing: Dict[str, float],
+        call_info: Dict[str, Any],
+    ):
+        """Ask the model to resume a truncated JSON answer and stitch the pieces together."""
+
+        if self.language == 'ja':
+            instruction = (
+                "直前の応答は出力上限で途中で切れました。直前の出力の最後の文字の直後から続きだけを出力してください。"
+                "すでに出力した部分の繰り返し、説明文、コードフェンスは不要です。"
+            )
+        else:
+            instruction = (
+                "Your previous answer was cut off by the output limit. Continue exactly where it stopped, "
+                "starting with the next character. Do not repeat earlier output, add explanations, or use code fences."
+            )
+        continuation_messages = messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": instruction},
+        ]
+        if self.time_budget is not None and not self.time_budget.admits(
+            sum(self.estimate_tokens(message['content']) for message in continuation_messages)
+            + SCHEDULE_CALL_COST_TOKENS
+        ):
+            raise DeadlineExceeded("continuation would overrun the time budget")
+        completion = self._request_completion(
+            {
+                "model": self.model,
+                "messages": continuation_messages,
+                "temperature": LLM_TEMPERATURE,
+                "max_tokens": self._completion_budget(continuation_messages),
+            },
+            timing,
+            call_info,
+            monitor_json=False,
+        )
+
+        piece = completion.content.strip()
+        if piece.startswith('```'):
+            piece = piece.split('\n', 1)[1] if '\n' in piece else ''
+        # Some models restart the whole document instead of continuing; prefer that when complete.
+        try:
+            json.loads(piece.strip().rstrip('`').strip())
+            return completion, piece
+        except json.JSONDecodeError:
+            return completion, content + piece
+
+    def _request_completion(
+        self,
+        payload: Dict[str, Any],
+        timing: Dict[str, float],
+        call_info: Dict[str, Any],
+        monitor_json: bool = True,
+    ) -> Completion:
+        """Send a chat completion request, retrying transient failures with backoff.
+
+        Every attempt first passes the circuit breaker, so a server that is clearly down
+        pauses dispatch instead of failing the remaining batches one after another.
+        Retries prefer a different endpoint than the one that just failed. With a rate
+        limit configured, every attempt is also charged against the token bucket.
+        """
+
+        attempt = 0
+        failed_urls: List[str] = []
+        charged_tokens = sum(self.estimate_tokens(message['content']) for message in payload['messages'])
+        while True:
+            attempt += 1
+            queued_at = time.monotonic()
+            with self.tracer.span('queue', 'request', attempt=attempt):
+                self._wait_in_queue(charged_tokens, timing)
+                endpoint = self.client.pool.acquire(exclude=failed_urls)
+            self._add_timing(timing, 'queue_ms', time.monotonic() - queued_at)
+            if self.time_budget is not None and not self.time_budget.admits(
+                charged_tokens + SCHEDULE_CALL_COST_TOKENS
+            ):
+                # The wait in the queue used up what the budget had left for this request.
+                self._abandon_request(endpoint, charged_tokens)
+                raise DeadlineExceeded("the request waited past the time budget")
+            call_info['attempts'] += 1
+            call_info['api_url'] = endpoint.url
+            if self.debug:
+                print(f"[DEBUG] API URL: {endpoint.chat_completions_url}", file=sys.stderr)
+            self._add_progress('in_flight', 1)
+            try:
+                completion = self._send_attempt(
+                    payload, timing, endpoint, call_info, charged_tokens, monitor_json
+                )
+            except Exception as exc:
+                self._add_progress('in_flight', -1)
+                retryable = self.retry_policy.is_retryable(exc)
+                if retryable:
+                    self.circuit_breaker.record_failure()
+                    failed_urls.append(endpoint.url)
+                else:
+                    # The server answered, so it is up even if this request failed.
+                    self.circuit_breaker.record_success()
+                if not retryable or attempt > self.retry_policy.max_retries:
+                    raise
+                delay = self.retry_policy.backoff(attempt, getattr(exc, 'retry_after', None))
+                if self.time_budget is not None and not self.time_budget.admits(
+                    sum(self.estimate_tokens(message['content']) for message in payload['messages'])
+                    + SCHEDULE_CALL_COST_TOKENS,
+                    delay=delay,
+                ):
+                    # A retry would overrun the time budget; give up on this request instead.
+                    raise
+                call_info['backoff_s'] += delay
+                print(
+                    f"LLM呼び出しに失敗したため {delay:.1f}秒後に再試行します "
+                    f"({attempt}/{self.retry_policy.max_retries}): {exc}",
+                    file=sys.stderr,
+                )
+                time.sleep(delay)
+                continue
+            self._add_progress('in_flight', -1)
+            self._add_usage(call_info, completion.usage)
+            self._record_prompt_usage(completion.usage)
+            self._settle_rate_limit(charged_tokens, completion)
+            self.circuit_breaker.record_success()
+            return completion
+
+    def _cache_key(self, prompt_hash: str, system_message: str, payload: Dict[str, Any]) -> str:
+        """Response cache key of ``payload`` as it is sent to the server."""
+
+        params = {key: value for key, value in payload.items() if key not in ('model', 'messages')}
+        return ResponseCache.make_key(
+            prompt_hash=prompt_hash,
+            model=self.model,
+            system_prompt=system_message,
+            params=params,
+        )
+
+    def _served_tokens(self, prompt_tokens: int, completion: Completion) -> int:
+        """Prompt plus completion tokens of a request, from the server's usage when present."""
+
+        usage = completion.usage or {}
+        return int(usage.get('total_tokens') or (prompt_tokens + self.estimate_tokens(completion.content)))
+
+    def _settle_rate_limit(self, charged_tokens: int, completion: Completion) -> None:
+        """Replace the token estimate charged for a request with what it actually used."""
+
+        if not self.rate_limiter.enabled:
+            return
+        self.rate_limiter.settle(charged_tokens, self._served_tokens(charged_tokens, completion))
+
+    def _wait_in_queue(self, charged_tokens: int, timing: Dict[str, float]) -> None:
+        """Pass the circuit breaker, the rate limit and the concurrency limit, in that order.
+
+        With a time budget none of them waits past the last moment the request could still
+        be sent; whatever was already taken is handed back and ``DeadlineExceeded`` raised.
+        """
+
+        start_by = (
+            self.time_budget.latest_start(charged_tokens + SCHEDULE_CALL_COST_TOKENS)
+            if self.time_budget is not None
+            else None
+        )
+        try:
+            self.circuit_breaker.before_request(deadline=start_by)
+            rate_charged = False
+            try:
+                if self.rate_limiter.enabled:
+                    waited = self.rate_limiter.acquire(charged_tokens, deadline=start_by)
+                    rate_charged = True
+                    self._add_timing(timing, 'rate_wait_ms', waited)
+                if self.concurrency_limiter is not None:
+                    # Released by _send_attempt once the request has really ended.
+                    self.concurrency_limiter.acquire(deadline=start_by)
+            except DeadlineExceeded:
+                if rate_charged:
+                    self.rate_limiter.settle(charged_tokens, 0)
+                self.circuit_breaker.abandon()
+                raise
+        except DeadlineExceeded:
+            self.time_budget.refuse()
+            raise
+
+    def _abandon_request(self, endpoint: Endpoint, charged_tokens: int) -> None:
+        """Hand back everything a request took in the queue without sending it."""
+
+        self.client.pool.release(endpoint, ok=False, cancelled=True)
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(outcome='error')
+        self.rate_limiter.settle(charged_tokens, 0)
+        self.circuit_breaker.abandon()
+
+    def _release_concurrency(
+        self,
+        started: float,
+        prompt_tokens: int,
+        *,
+        completion: Optional[Completion] = None,
+        error: Optional[BaseException] = None,
+        cancelled: bool = False,
+    ) -> None:
+        """Give a request's limiter slot back, reporting how it went to the AIMD controller."""
+
+        if self.concurrency_limiter is None:
+            return
+        latency = time.monotonic() - started
+        if completion is not None:
+            self.concurrency_limiter.release(
+                outcome='ok', latency=latency, tokens=self._served_tokens(prompt_tokens, completion)
+            )
+        else:
+            overload = error is not None and is_overload_error(error) and not cancelled
+            self.concurrency_limiter.release(outcome='overload' if overload else 'error', latency=latency)
+
+    def _reserve_hedge(self, hedge_endpoint: Endpoint, endpoint: Endpoint, tokens: int) -> bool:
+        """Take a limiter slot and rate-limit tokens for a hedge if both are free right now.
+
+        Hedges only use spare capacity; waiting for either would send the duplicate after
+        the primary may already have answered.
+        """
+
+        if hedge_endpoint.url == endpoint.url:
+            # Every other endpoint is ejected; a duplicate would only add load here.
+            return False
+        if self.concurrency_limiter is not None and not self.concurrency_limiter.try_acquire():
+            return False
+        if not self.rate_limiter.try_acquire(tokens):
+            if self.concurrency_limiter is not None:
+                self.concurrency_limiter.release(outcome='error')
+            return False
+        return True
+
+    def _send_attempt(
+        self,
+        payload: Dict[str, Any],
+        timing: Dict[str, float],
+        endpoint: Endpoint,
+        call_info: Dict[str, Any],
+        charged_tokens: int,
+        monitor_json: bool = True,
+    ) -> Completion:
+        """Run one attempt on ``endpoint``, hedging it on a second endpoint when it is slow.
+
+        Once the attempt has been in flight longer than the hedge threshold, a duplicate is
+        sent to another endpoint and whichever answers first wins; the other one is
+        cancelled. Requests that may be hedged are always streamed, so cancelling drops the
+        connection and the server stops generating. Endpoints and concurrency limiter slots
+        are released here, each when its request has really ended, so the caller only sees
+        a single logical attempt.
+        """
+
+        threshold = self.hedge_policy.threshold() if self.hedge_policy is not None else None
+        if threshold is None:
+            started = time.monotonic()
+            try:
+                completion = self._traced_completion(
+                    payload, timing, endpoint, call_info, monitor_json
+                )
+            except Exception as exc:
+                self.client.pool.release(
+                    endpoint, ok=False, transient=self.retry_policy.is_retryable(exc)
+                )
+                self._release_concurrency(started, charged_tokens, error=exc)
+                raise
+            self.client.pool.release(endpoint, ok=True)
+            self._release_concurrency(started, charged_tokens, completion=completion)
+            if self.hedge_policy is not None:
+                self.hedge_policy.observe(time.monotonic() - started)
+            return completion
+
+        results: queue.Queue = queue.Queue()
+        cancel = RequestCancel()
+        trace_tags = self.tracer.current_tags()
+
+        def run(target: Endpoint, own_timing: Dict[str, float], hedge: bool) -> None:
+            started = time.monotonic()
+            try:
+                with self.tracer.tags(**trace_tags):
+                    completion = self._traced_completion(
+                        payload, own_timing, target, call_info, monitor_json,
+                        cancel=cancel, hedge=hedge,
+                    )
+            except Exception as exc:
+                if cancel.is_set():
+                    self.client.pool.release(target, ok=False, cancelled=True)
+                else:
+                    self.client.pool.release(
+                        target, ok=False, transient=self.retry_policy.is_retryable(exc)
+                    )
+                self._release_concurrency(started, charged_tokens, error=exc, cancelled=cancel.is_set())
+                results.put((target, own_timing, None, exc, 0.0))
+                return
+            elapsed = time.monotonic() - started
+            self.client.pool.release(target, ok=True, cancelled=cancel.is_set())
+            self._release_concurrency(started, charged_tokens, completion=completion)
+            if hedge:
+                # The primary's token charge is settled by the caller.
+                self._settle_rate_limit(charged_tokens, completion)
+            results.put((target, own_timing, completion, None, elapsed))
+
+        threading.Thread(target=run, args=(endpoint, {}, False), daemon=True).start()
+        try:
+            first = results.get(timeout=threshold)
+        except queue.Empty:
+            first = None
+        in_flight = 1
+        if first is None:
+            hedge_endpoint = self.client.pool.acquire(exclude=[endpoint.url])
+            if self._reserve_hedge(hedge_endpoint, endpoint, charged_tokens):
+                call_info['hedged'] = True
+                if self.debug:
+                    print(
+                        f"[DEBUG] {threshold:.1f}秒以内に応答がないため {hedge_endpoint.url} にも送信します",
+                        file=sys.stderr,
+                    )
+                threading.Thread(target=run, args=(hedge_endpoint, {}, True), daemon=True).start()
+                in_flight = 2
+            else:
+                self.client.pool.release(hedge_endpoint, ok=False, cancelled=True)
+            first = results.get()
+        outcomes = [first]
+        while outcomes[-1][3] is not None and len(outcomes) < in_flight:
+            outcomes.append(results.get())
+        # The loser's socket is shut down; its thread releases its own slots when it ends.
+        cancel.set()
+
+        winner = next((outcome for outcome in outcomes if outcome[3] is None), outcomes[0])
+        target, own_timing, completion, error, elapsed = winner
+        if error is None:
+            # Only the winner's latency: a cancelled loser would push the threshold up.
+            self.hedge_policy.observe(elapsed)
+        if in_flight > 1:
+            hedge_won = target.url != endpoint.url
+            self.hedge_policy.record(hedge_won=hedge_won)
+            timing['hedge_after_ms'] = round(threshold * 1000, 1)
+            if hedge_won:
+                # The wall time of this attempt includes the wait before the hedge was sent.
+                self._add_timing(own_timing, 'total_ms', threshold)
+        call_info['api_url'] = target.url
+        for key, value in own_timing.items():
+            if key == 'ttft_ms':
+                timing.setdefault(key, value)
+            elif key.endswith('_ms'):
+                timing[key] = round(timing.get(key, 0.0) + value, 1)
+            else:
+                timing[key] = value
+        if error is not None:
+            raise error
+        return completion
+
+    def _traced_completion(
+        self,
+        payload: Dict[str, Any],
+        timing: Dict[str, float],
+        endpoint: Endpoint,
+        call_info: Dict[str, Any],
+        monitor_json: bool = True,
+        cancel: Optional[RequestCancel] = None,
+        hedge: bool = False,
+    ) -> Completion:
+        """``_send_completion`` as a trace span, counting requests in flight per endpoint."""
+
+        self.tracer.adjust('in_flight', endpoint.url, 1)
+        try:
+            with self.tracer.span(
+                'call_llm', 'request', endpoint=endpoint.url, attempt=call_info['attempts'], hedge=hedge or None
+            ) as span:
+                try:
+                    completion = self._send_completion(payload, timing, endpoint, monitor_json, cancel=cancel)
+                except Exception as exc:
+                    span['error'] = 'cancelled' if cancel is not None and cancel.is_set() else str(exc)[:200]
+                    raise
+                span['finish_reason'] = completion.finish_reason
+                return completion
+        finally:
+            self.tracer.adjust('in_flight', endpoint.url, -1)
+
+    def _send_completion(
+        self,
+        payload: Dict[str, Any],
+        timing: Dict[str, float],
+        endpoint: Endpoint,
+        monitor_json: bool = True,
+        cancel: Optional[RequestCancel] = None,
+    ) -> Completion:
+        """Send one chat completion request and return the completion.
+
+        Raises ``LLMResponseError`` for non-200 answers and ``StreamAbortedError`` when a
+        streamed response had to be cut off; timings are accumulated into ``timing`` so
+        continuation requests add up. A request that can be cancelled is streamed even
+        without ``--stream``, since only a dropped stream makes the server stop.
+        """
+
+        take_connect_time()
+        started = time.monotonic()
+        if not self.stream and cancel is None:
+            response = self.client.post_chat_completion(
+                payload, timeout=API_TIMEOUT_SECONDS, endpoint=endpoint
+            )
+            self._add_timing(timing, 'total_ms', time.monotonic() - started)
+            self._add_timing(timing, 'connect_ms', take_connect_time())
+            if self.debug:
+                print(f"[DEBUG] LLM応答ステータス: {response.status_code}", file=sys.stderr)
+            if response.status_code != 200:
+                raise LLMResponseError(
+                    response.status_code,
+                    response.text,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After')),
+                )
+            result = response.json()
+            choice = result['choices'][0]
+            return Completion(
+                content=choice['message']['content'],
+                finish_reason=choice.get('finish_reason'),
+                usage=result.get('usage'),
+            )
+
+        streamed = self.client.stream_chat_completion(
+            payload,
+            timeout=API_TIMEOUT_SECONDS,
+            endpoint=endpoint,
+            monitor=JsonStreamMonitor() if monitor_json and self.stream else None,
+            max_duration=API_TIMEOUT_SECONDS,
+            cancel=cancel,
+        )
+        self._add_timing(timing, 'total_ms', time.monotonic() - started)
+        self._add_timing(timing, 'connect_ms', take_connect_time())
+        if self.debug:
+            print(f"[DEBUG] LLM応答ステータス: {streamed.status_code} (ストリーミング)", file=sys.stderr)
+        if streamed.status_code != 200:
+            raise LLMResponseError(
+                streamed.status_code, streamed.error_text, retry_after=streamed.retry_after
+            )
+
+        if streamed.ttft is not None:
+            timing.setdefault('ttft_ms', round(streamed.ttft * 1000, 1))
+            self._add_timing(timing, 'generation_ms', streamed.generation_time)
+            generated = (streamed.usage or {}).get('completion_tokens') or self.estimate_tokens(streamed.content)
+            if streamed.generation_time > 0:
+                timing['tokens_per_s'] = round(generated / streamed.generation_time, 1)
+        if streamed.aborted and streamed.aborted != 'trailing_output':
+            raise StreamAbortedError(streamed.aborted, streamed.content)
+        return Completion(
+            content=streamed.content,
+            finish_reason=streamed.finish_reason,
+            usage=streamed.usage,
+        )
+
+    @staticmethod
+    def _add_usage(call_info: Dict[str, Any], usage: Optional[Dict[str, Any]]) -> None:
+        """Accumulate server-reported usage over the continuation requests of one call."""
+
+        if not usage:
+            return
+        total = call_info.setdefault('usage', {})
+        for key in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            if isinstance(usage.get(key), int):
+                total[key] = total.get(key, 0) + usage[key]
+        cached = (usage.get('prompt_tokens_details') or {}).get('cached_tokens')
+        if isinstance(cached, int):
+            total['cached_tokens'] = total.get('cached_tokens', 0) + cached
+
+    def _record_prompt_usage(self, usage: Optional[Dict[str, Any]]) -> None:
+        """Track how much of the prompt the server served from its prefix (KV) cache."""
+
+        if not usage or not isinstance(usage.get('prompt_tokens'), int):
+            return
+        cached = (usage.get('prompt_tokens_details') or {}).get('cached_tokens')
+        with self._prompt_usage_lock:
+            self._prompt_usage['requests'] += 1
+            self._prompt_usage['prompt_tokens'] += usage['prompt_tokens']
+            if isinstance(cached, int):
+                self._prompt_usage['reported'] += 1
+                self._prompt_usage['cached_tokens'] += cached
+
+    @staticmethod
+    def _add_timing(timing: Dict[str, float], key: str, seconds: float) -> None:
+        timing[key] = round(timing.get(key, 0.0) + seconds * 1000, 1)
     
     def review_file(
         self,
         file_path: Path,
         repo_overview_entries: Optional[List[Dict[str, Any]]] = None,
+        results: Optional[List[Dict[str, Any]]] = None,
     ):
         try:
             content = file_path.read_text(encoding='utf-8')
@@ -591,51 +1697,136 @@ Be specific about line numbers and provide clear, actionable feedback."""
         self.coverage.register_targets(chunk_targets)
         file_reviews = []
 
-        for chunk, target in zip(chunks, chunk_targets):
+        for chunk in chunks:
+            file_reviews.extend(
+                self._review_chunk(file_path, relative_path, chunk, repo_overview_entries)
+            )
+
+        if file_reviews:
+            self.append_result(
+                str(file_path.relative_to(self.code_dir)), file_reviews, results=results
+            )
+
+    def _review_chunk(
+        self,
+        file_path: Path,
+        relative_path: str,
+        chunk: Chunk,
+        repo_overview_entries: Optional[List[Dict[str, Any]]],
+    ) -> List[Dict[str, Any]]:
+        """Review one chunk and return its reviews with file-relative line numbers.
+
+        A chunk whose request failed in a way a smaller request could avoid is split in
+        half; the halves replace it as coverage targets and are reviewed recursively.
+        """
+
+        ledger_files = [
+            {
+                'path': relative_path,
+                'sha256': chunk.sha256,
+                'start_line': chunk.start_line,
+                'end_line': chunk.end_line,
+                'chunk_id': chunk.chunk_id,
+            }
+        ]
+        chunk_reviews = self.findings.lookup(ledger_files[0]) if self.findings else None
+        if chunk_reviews is not None:
+            self._record_replay(ledger_files)
+        else:
             prompt = self.generate_review_prompt(
                 file_path,
                 chunk.content,
                 chunk,
                 repo_overview_entries=repo_overview_entries,
             )
-            ledger_files = [
-                {
-                    'path': target.path,
-                    'sha256': target.sha256,
-                    'start_line': target.start_line,
-                    'end_line': target.end_line,
-                    'chunk_id': target.chunk_id,
-                }
-            ]
-            result = self.call_llm(prompt, ledger_files)
-
-            if result and 'reviews' in result:
-                for review in result['reviews']:
-                    if chunk.start_line > 1 and isinstance(review.get('line'), int):
-                        review['line'] += chunk.start_line - 1
-                    file_reviews.append(review)
-
-        if file_reviews:
-            self.append_result(str(file_path.relative_to(self.code_dir)), file_reviews)
+            outcome: Dict[str, Any] = {}
+            result = self.call_llm(
+                prompt,
+                ledger_files,
+                code_chars={file_path.suffix: len(chunk.content)},
+                outcome=outcome,
+            )
+            truncated = bool(outcome.get('missing'))
+            if isinstance(result, dict) and isinstance(result.get('reviews'), list) and not truncated:
+                chunk_reviews = result['reviews']
+                self._store_findings(ledger_files[0], chunk_reviews)
+            elif (
+                (result is None or truncated)
+                and chunk.end_line - chunk.start_line + 1 >= 2 * BISECT_MIN_LINES
+                and self._should_bisect(outcome)
+            ):
+                halves = self._split_chunk(chunk)
+                print(
+                    f"レビューに失敗したためチャンクを分割して再実行します: {relative_path} "
+                    f"行 {chunk.start_line}-{chunk.end_line} ({outcome.get('failure')})",
+                    file=sys.stderr,
+                )
+                self.coverage.register_targets(
+                    CoverageTarget(
+                        path=relative_path,
+                        sha256=half.sha256,
+                        start_line=half.start_line,
+                        end_line=half.end_line,
+                        chunk_id=half.chunk_id,
+                    )
+                    for half in halves
+                )
+                self.coverage.supersede(ledger_files)
+                reviews: List[Dict[str, Any]] = []
+                for half in halves:
+                    reviews.extend(
+                        self._review_chunk(file_path, relative_path, half, repo_overview_entries)
+                    )
+                return reviews
+            elif truncated:
+                # Keep what the cut-off answer found, but leave the chunk to a later run.
+                chunk_reviews = result.get('reviews') if isinstance(result, dict) else None
+                self.coverage.mark_unreviewed(ledger_files, self._unanswered_reason(outcome))
+
+        reviews = []
+        for review in chunk_reviews or []:
+            if chunk.start_line > 1 and isinstance(review.get('line'), int):
+                review['line'] += chunk.start_line - 1
+            reviews.append(review)
+        return reviews
+
+    @staticmethod
+    def _split_chunk(chunk: Chunk) -> List[Chunk]:
+        lines = chunk.content.split('\n')
+        middle = len(lines) // 2
+        return [
+            Chunk(
+                content='\n'.join(part),
+                start_line=start_line,
+                end_line=start_line + len(part) - 1,
+                index=chunk.index,
+                chunk_id=f"{chunk.chunk_id}.{half}",
+                sha256=chunk.sha256,
+            )
+            for half, (part, start_line) in enumerate((
+                (lines[:middle], chunk.start_line),
+                (lines[middle:], chunk.start_line + middle),
+            ))
+        ]
 
     def review_batch(
         self,
         file_paths: List[Path],
         repo_overview_entries: Optional[List[Dict[str, Any]]] = None,
+        results: Optional[List[Dict[str, Any]]] = None,
+        batch_id: Optional[Union[int, str]] = None,
     ):
         if len(file_paths) == 1:
-            self.review_file(file_paths[0], repo_overview_entries=repo_overview_entries)
+            self.review_file(
+                file_paths[0], repo_overview_entries=repo_overview_entries, results=results
+            )
             return
 
         repo_overview = self.get_repo_overview_context(
-            file_paths, repo_overview_entries=repo_overview_entries
+            None if self.prompt_layout == 'prefix-cache' else file_paths,
+            repo_overview_entries=repo_overview_entries,
         )
 
-        if self.language == 'ja':
-            combined_content = f"複数の関連ファイルをレビューします（{len(file_paths)}ファイル）:\n\n"
-        else:
-            combined_content = f"Reviewing {len(file_paths)} related files together:\n\n"
-        
         file_contents = []
         for file_path in file_paths:
             try:
@@ -652,7 +1843,6 @@ Be specific about line numbers and provide clear, actionable feedback."""
                     'sha256': file_sha,
                     'line_count': line_count,
                 })
-                combined_content += f"--- File: {relative_path} ---\n{content}\n\n"
             except Exception as e:
                 print(f"{file_path}の読み込みエラー: {e}", file=sys.stderr)
                 relative_path = str(file_path.relative_to(self.code_dir))
@@ -661,7 +1851,8 @@ Be specific about line numbers and provide clear, actionable feedback."""
         if not file_contents:
             return
 
-        batch_id = self._next_batch_id()
+        if batch_id is None:
+            batch_id = self._next_batch_id()
         batch_targets = []
         ledger_files = []
         for idx, info in enumerate(file_contents):
@@ -683,80 +1874,219 @@ Be specific about line numbers and provide clear, actionable feedback."""
             })
 
         self.coverage.register_targets(batch_targets)
-        
-        language = self.supported_extensions.get(file_paths[0].suffix, 'Unknown')
-        focus_instructions = self.get_focus_instructions()
-        
-        if self.language == 'ja':
-            prompt = f"""あなたは{language}とROS2開発に精通したエキスパートコードレビュアーです。
-以下の複数の関連ファイルをまとめてレビューし、ファイル間の依存関係や相互作用も考慮してください。
 
-{focus_instructions}
+        # In incremental mode, files whose exact content was already reviewed under the same
+        # configuration are replayed from the findings store and left out of the prompt.
+        reviews_by_file: Dict[str, List[Dict[str, Any]]] = {}
+        replayed_entries = []
+        pending = []
+        for info, entry in zip(file_contents, ledger_files):
+            stored = self.findings.lookup(entry) if self.findings else None
+            if stored is not None:
+                reviews_by_file[info['relative_path']] = stored
+                replayed_entries.append(entry)
+            else:
+                pending.append((info, entry))
 
-{repo_overview}
+        if replayed_entries:
+            self._record_replay(replayed_entries)
+        if not pending:
+            self._append_batch_results(file_contents, reviews_by_file, results)
+            return
+        ledger_files = [entry for _, entry in pending]
 
-{combined_content}
+        if self.language == 'ja':
+            combined_content = f"複数の関連ファイルをレビューします（{len(pending)}ファイル）:\n\n"
+        else:
+            combined_content = f"Reviewing {len(pending)} related files together:\n\n"
+        code_chars: Dict[str, int] = {}
+        for info, _ in pending:
+            combined_content += f"--- File: {info['relative_path']} ---\n{info['content']}\n\n"
+            suffix = info['path'].suffix
+            code_chars[suffix] = code_chars.get(suffix, 0) + len(info['content'])
+
+        language = self.supported_extensions.get(file_paths[0].suffix, 'Unknown')
+        focus_instructions = self.get_focus_instructions()
 
-各ファイルごとに問題点を JSON 形式で返してください:
-{{"file": "相対パス", "reviews": [{{"line": 行番号, "severity": "error/warning/info", "risk_score": <1から10の整数>, "message": "指摘内容"}}]}}
+        if self.language == 'ja':
+            header = f"""あなたは{language}とROS2開発に精通したエキスパートコードレビュアーです。
+以下の複数の関連ファイルをまとめてレビューし、ファイル間の依存関係や相互作用も考慮してください。
+"""
+            schema = """各ファイルごとに問題点を JSON 形式で返してください:
+{"file": "相対パス", "reviews": [{"line": 行番号, "severity": "error/warning/info", "risk_score": <1から10の整数>, "message": "指摘内容"}]}
 
-複数ファイルがある場合は配列で返してください: [{{"file": "...", "reviews": [...]}}, ...]
+複数ファイルがある場合は配列で返してください: [{"file": "...", "reviews": [...]}, ...]
 
 `risk_score` は 1 から 10 の整数で、10 は修正必須、1 は様子見で問題ないレベルを意味します。
 """
         else:
-            prompt = f"""You are an expert code reviewer specializing in {language} and ROS2 development.
+            header = f"""You are an expert code reviewer specializing in {language} and ROS2 development.
 Review the following related files together, considering cross-file dependencies and interactions.
+"""
+            schema = """Return issues in JSON format for each file:
+{"file": "relative_path", "reviews": [{"line": line_number, "severity": "error/warning/info", "risk_score": <integer 1-10>, "message": "issue description"}]}
+
+For multiple files, return an array: [{"file": "...", "reviews": [...]}, ...]
+
+The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix immediately).
+"""
 
+        if self.prompt_layout == 'prefix-cache':
+            prompt = self._shared_prompt_prefix(repo_overview, schema) + f"{header}\n{combined_content}"
+        else:
+            prompt = f"""{header}
 {focus_instructions}
 
 {repo_overview}
 
 {combined_content}
 
-Return issues in JSON format for each file:
-{{"file": "relative_path", "reviews": [{{"line": line_number, "severity": "error/warning/info", "risk_score": <integer 1-10>, "message": "issue description"}}]}}
+{schema}"""
 
-For multiple files, return an array: [{{"file": "...", "reviews": [...]}}, ...]
+        outcome: Dict[str, Any] = {}
+        result = self.call_llm(
+            prompt,
+            ledger_files,
+            code_chars=code_chars,
+            response_shape='batch_review',
+            outcome=outcome,
+        )
+        if result is None:
+            if len(pending) > 1 and self._should_bisect(outcome):
+                self._bisect_batch(
+                    pending, batch_id, repo_overview_entries, reviews_by_file, outcome
+                )
+            self._append_batch_results(file_contents, reviews_by_file, results)
+            return
 
-The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix immediately).
-"""
-        
-        result = self.call_llm(prompt, ledger_files)
-
-        if result:
-            if isinstance(result, dict) and 'file' in result:
-                if result.get('reviews'):
-                    self.append_result(result['file'], result['reviews'])
-            elif isinstance(result, list):
-                for file_result in result:
-                    if file_result.get('reviews') and 'file' in file_result:
-                        self.append_result(file_result['file'], file_result['reviews'])
-            elif isinstance(result, dict) and 'reviews' in result:
-                if result.get('reviews'):
-                    self.append_result(
-                        str(file_paths[0].relative_to(self.code_dir)),
-                        result['reviews']
-                    )
+        file_results = []
+        if isinstance(result, dict) and 'file' in result:
+            file_results.append((result['file'], result.get('reviews')))
+        elif isinstance(result, list):
+            for file_result in result:
+                if isinstance(file_result, dict) and 'file' in file_result:
+                    file_results.append((file_result['file'], file_result.get('reviews')))
+        elif isinstance(result, dict) and isinstance(result.get('files'), list):
+            for file_result in result['files']:
+                if isinstance(file_result, dict) and 'file' in file_result:
+                    file_results.append((file_result['file'], file_result.get('reviews')))
+        elif isinstance(result, dict) and 'reviews' in result:
+            file_results.append((pending[0][0]['relative_path'], result.get('reviews')))
+
+        llm_reviews: Dict[str, List[Dict[str, Any]]] = {}
+        for file_identifier, reviews in file_results:
+            if isinstance(reviews, list):
+                llm_reviews.setdefault(str(file_identifier), []).extend(reviews)
+
+        # Files a truncated answer did not fully cover are re-reviewed, or left uncovered.
+        missing_chunks = {entry['chunk_id'] for entry in outcome.get('missing', [])}
+        answered = [(info, entry) for info, entry in pending if entry['chunk_id'] not in missing_chunks]
+        unanswered = [(info, entry) for info, entry in pending if entry['chunk_id'] in missing_chunks]
+        if file_results:
+            for info, entry in answered:
+                self._store_findings(entry, llm_reviews.get(info['relative_path'], []))
+        if unanswered and self._should_bisect(outcome):
+            for info, _ in unanswered:
+                llm_reviews.pop(info['relative_path'], None)
+            self._bisect_batch(unanswered, batch_id, repo_overview_entries, reviews_by_file, outcome)
+        elif unanswered:
+            self.coverage.mark_unreviewed([entry for _, entry in unanswered], self._unanswered_reason(outcome))
+
+        for file_identifier, reviews in llm_reviews.items():
+            reviews_by_file.setdefault(file_identifier, []).extend(reviews)
+        self._append_batch_results(file_contents, reviews_by_file, results)
+
+    def _bisect_batch(
+        self,
+        pending: List[Tuple[Dict[str, Any], Dict[str, object]]],
+        batch_id: Union[int, str],
+        repo_overview_entries: Optional[List[Dict[str, Any]]],
+        reviews_by_file: Dict[str, List[Dict[str, Any]]],
+        outcome: Dict[str, Any],
+    ) -> None:
+        """Re-review the files of a failed batch, or those a truncated answer left out, as two half batches.
+
+        Halves keep splitting on failure down to single files, which are then reviewed
+        (and, if needed, split further) chunk by chunk. The failed batch targets are
+        superseded by the targets the halves register.
+        """
+
+        middle = len(pending) // 2
+        halves = [half for half in (pending[:middle], pending[middle:]) if half]
+        print(
+            f"バッチのレビューに失敗したため分割して再実行します: "
+            f"{len(pending)} → {' + '.join(str(len(half)) for half in halves)}ファイル ({outcome.get('failure')})",
+            file=sys.stderr,
+        )
+        self.coverage.supersede([entry for _, entry in pending])
+        for half_idx, half in enumerate(halves):
+            half_results: List[Dict[str, Any]] = []
+            half_id = f"{batch_id}.{half_idx}"
+            with self.tracer.tags(batch=half_id), self.tracer.span(
+                f"batch {half_id}", 'batch', files=len(half)
+            ):
+                self.review_batch(
+                    [info['path'] for info, _ in half],
+                    repo_overview_entries=repo_overview_entries,
+                    results=half_results,
+                    batch_id=half_id,
+                )
+            for item in half_results:
+                reviews_by_file.setdefault(item['file'], []).extend(item['reviews'])
+
+    def _append_batch_results(
+        self,
+        file_contents: List[Dict[str, Any]],
+        reviews_by_file: Dict[str, List[Dict[str, Any]]],
+        results: Optional[List[Dict[str, Any]]],
+    ) -> None:
+        # Emit batch findings in file order so replayed and fresh reviews merge deterministically;
+        # identifiers the model invented that match no batch file are kept at the end.
+        known = set()
+        for info in file_contents:
+            known.add(info['relative_path'])
+            reviews = reviews_by_file.get(info['relative_path'])
+            if reviews:
+                self.append_result(info['relative_path'], reviews, results=results)
+        for file_identifier, reviews in reviews_by_file.items():
+            if file_identifier not in known and reviews:
+                self.append_result(file_identifier, reviews, results=results)
     
     def build_graph(self):
         graph = StateGraph(ReviewerState)
 
-        graph.add_node("collect_files", self._collect_files_node)
-        graph.add_node("build_overview", self._build_overview_node)
-        graph.add_node("create_batches", self._create_batches_node)
-        graph.add_node("review_batches", self._review_batches_node)
-        graph.add_node("finalize", self._finalize_node)
+        graph.add_node("collect_files", self._timed_node("collect_files", self._collect_files_node))
+        graph.add_node("dedupe_files", self._timed_node("dedupe_files", self._dedupe_files_node))
+        graph.add_node("build_overview", self._timed_node("build_overview", self._build_overview_node))
+        graph.add_node("create_batches", self._timed_node("create_batches", self._create_batches_node))
+        graph.add_node("review_batches", self._timed_node("review_batches", self._review_batches_node))
+        graph.add_node("fan_out_duplicates", self._timed_node("fan_out_duplicates", self._fan_out_duplicates_node))
+        graph.add_node("finalize", self._timed_node("finalize", self._finalize_node))
 
         graph.set_entry_point("collect_files")
-        graph.add_edge("collect_files", "build_overview")
+        graph.add_edge("collect_files", "dedupe_files")
+        graph.add_edge("dedupe_files", "build_overview")
         graph.add_edge("build_overview", "create_batches")
         graph.add_edge("create_batches", "review_batches")
-        graph.add_edge("review_batches", "finalize")
+        graph.add_edge("review_batches", "fan_out_duplicates")
+        graph.add_edge("fan_out_duplicates", "finalize")
         graph.add_edge("finalize", END)
 
         return graph.compile()
 
+    def _timed_node(self, name: str, node):
+        def run_node(state: ReviewerState) -> ReviewerState:
+            started = time.monotonic()
+            try:
+                with self.tracer.span(name, 'node'):
+                    if self.profiler is not None:
+                        return self.profiler.run_stage(name, node, state)
+                    return node(state)
+            finally:
+                self.node_timings[name] = self.node_timings.get(name, 0.0) + time.monotonic() - started
+
+        return run_node
+
     def _collect_files_node(self, state: ReviewerState) -> ReviewerState:
         files = self.find_files()
         total_files = len(files)
@@ -770,6 +2100,32 @@ The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix i
             'processed_files': 0,
             'results': [],
             'repo_overview_entries': [],
+            'duplicates': {},
+            'duplicate_files': 0,
+        })
+        return updated_state
+
+    def _dedupe_files_node(self, state: ReviewerState) -> ReviewerState:
+        if not self.dedupe:
+            return dict(state)
+
+        representatives, duplicates = self.find_duplicates(state.get('files', []))
+        duplicate_files = sum(len(paths) for paths in duplicates.values())
+        if duplicate_files:
+            print(
+                f"内容が同一のファイル {duplicate_files}個は、代表ファイル {len(duplicates)}個の"
+                "レビュー結果を共有します"
+            )
+            if self.debug:
+                for representative, paths in duplicates.items():
+                    print(f"[DEBUG] {representative} と同一: {', '.join(paths)}", file=sys.stderr)
+
+        updated_state: ReviewerState = dict(state)
+        updated_state.update({
+            'files': representatives,
+            'total_files': len(representatives),
+            'duplicates': duplicates,
+            'duplicate_files': duplicate_files,
         })
         return updated_state
 
@@ -794,10 +2150,12 @@ The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix i
         if self.debug:
             print(f"[DEBUG] {total_batches}個のバッチを作成しました", file=sys.stderr)
             for i, batch in enumerate(batches, 1):
-                batch_tokens = sum(
-                    self.estimate_tokens(f.read_text(encoding='utf-8', errors='ignore'))
-                    for f in batch
-                )
+                batch_tokens = 0
+                for f in batch:
+                    try:
+                        batch_tokens += self.estimate_file_tokens(f)
+                    except Exception:
+                        continue
                 print(
                     f"[DEBUG] バッチ {i}: {len(batch)}ファイル, 約{batch_tokens}トークン",
                     file=sys.stderr,
@@ -814,10 +2172,167 @@ The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix i
         processed_files = state.get('processed_files', 0)
         repo_overview_entries = state.get('repo_overview_entries', self.repo_overview_entries)
 
+        # Batch IDs and progress offsets are fixed up front so chunk IDs and output order
+        # do not depend on which worker finishes first.
+        jobs = []
         for batch_idx, batch in enumerate(batches, 1):
-            batch_progress = (batch_idx / max(total_batches, 1)) * 100
-            file_progress = (processed_files / max(total_files, 1)) * 100
+            batch_id = self._next_batch_id() if len(batch) > 1 else None
+            jobs.append((batch_idx, batch, batch_id, processed_files))
+            processed_files += len(batch)
+        batch_results: List[List[Dict[str, Any]]] = [[] for _ in jobs]
+        self._add_progress('batches_total', len(jobs))
+        order = self._schedule_jobs([batch for _, batch, _, _ in jobs])
+
+        def run_job(job_idx: int) -> None:
+            batch_idx, batch, batch_id, processed_before = jobs[job_idx]
+            self._print_batch_progress(
+                batch_idx, batch, total_batches, processed_before, total_files
+            )
+            label = batch_id if batch_id is not None else str(batch[0].relative_to(self.code_dir))
+            with contextlib.ExitStack() as stack:
+                if self.profiler is not None:
+                    stack.enter_context(self.profiler.worker())
+                stack.enter_context(self.tracer.tags(batch=label))
+                stack.enter_context(self.tracer.span(f"batch {label}", 'batch', files=len(batch)))
+                self.review_batch(
+                    batch,
+                    repo_overview_entries=repo_overview_entries,
+                    results=batch_results[job_idx],
+                    batch_id=batch_id,
+                )
+            self._add_progress('batches_done', 1)
+
+        if self.concurrency <= 1:
+            for job_idx in order:
+                run_job(job_idx)
+        else:
+            if self.debug:
+                print(f"[DEBUG] 並列レビュー: 最大{self.concurrency}ワーカー", file=sys.stderr)
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                # The executor queue is FIFO, so submission order is dispatch order.
+                futures = [executor.submit(run_job, job_idx) for job_idx in order]
+                for future in as_completed(futures):
+                    future.result()
+
+        for results in batch_results:
+            self.results.extend(results)
+
+        updated_state: ReviewerState = dict(state)
+        updated_state.update({'processed_files': processed_files, 'results': self.results})
+        return updated_state
+
+    def _fan_out_duplicates_node(self, state: ReviewerState) -> ReviewerState:
+        duplicates = state.get('duplicates') or {}
+        if not duplicates:
+            return dict(state)
+
+        # Each copy gets the representative's findings right after it in the output.
+        results: List[Dict[str, Any]] = []
+        for result in self.results:
+            results.append(result)
+            for duplicate in duplicates.get(result['file'], []):
+                results.append({'file': duplicate, 'reviews': copy.deepcopy(result['reviews'])})
+        self.results = results
+
+        for representative, mirrored in self.coverage.mirror_targets(duplicates).items():
+            for duplicate, ledger_files in mirrored.items():
+                if not ledger_files:
+                    continue
+                self._append_ledger(
+                    files=ledger_files,
+                    model=self.model,
+                    api_url=self.api_url,
+                    max_context=self.context_length,
+                    prompt_hash="",
+                    prompt_tokens=0,
+                    completion_tokens=0,
+                    status='ok',
+                    attempts=0,
+                    duplicate_of=representative,
+                )
+
+        updated_state: ReviewerState = dict(state)
+        updated_state['results'] = self.results
+        return updated_state
+
+    def _priority_rank(self, batch: List[Path]) -> int:
+        """Index of the first priority pattern matching a file of the batch, or len(patterns)."""
 
+        relative_paths = [str(file_path.relative_to(self.code_dir)) for file_path in batch]
+        for rank, pattern in enumerate(self.priority_patterns):
+            directory = pattern.rstrip('/') + '/'
+            for relative_path in relative_paths:
+                if fnmatch.fnmatch(relative_path, pattern) or relative_path.startswith(directory):
+                    return rank
+        return len(self.priority_patterns)
+
+    def _estimate_job_cost(self, batch: List[Path]) -> int:
+        """Rough cost of a batch in tokens: its content plus a fixed cost per LLM request."""
+
+        tokens = 0
+        requests_needed = 1
+        for file_path in batch:
+            try:
+                content = file_path.read_text(encoding='utf-8')
+            except Exception:
+                continue
+            tokens += self.estimate_tokens(content, file_path.suffix)
+            if len(batch) == 1:
+                requests_needed = len(self.split_file_content(content, file_path))
+        return tokens + requests_needed * SCHEDULE_CALL_COST_TOKENS
+
+    def _schedule_jobs(self, batches: List[List[Path]]) -> List[int]:
+        """Return batch indices in dispatch order.
+
+        Batches touching paths from the priority list go first, in list order. With several
+        workers the rest is ordered longest-processing-time first, so a long chunked file
+        starts early instead of stretching the tail of the run. Results are still merged
+        in the original batch order.
+        """
+
+        if self.concurrency <= 1 and not self.priority_patterns:
+            return list(range(len(batches)))
+
+        ranks = [self._priority_rank(batch) for batch in batches]
+        if self.concurrency > 1:
+            costs = [self._estimate_job_cost(batch) for batch in batches]
+        else:
+            costs = [0] * len(batches)
+        order = sorted(range(len(batches)), key=lambda idx: (ranks[idx], -costs[idx], idx))
+
+        total_cost = sum(costs)
+        prioritized = sum(1 for rank in ranks if rank < len(self.priority_patterns))
+        self.metrics.update('schedule', {
+            'strategy': 'lpt' if self.concurrency > 1 else 'sequential',
+            'jobs': len(batches),
+            'priority_jobs': prioritized,
+            'estimated_cost_tokens': total_cost,
+            # Lower bound on the makespan in cost units: no schedule beats the longest job
+            # or a perfect split of the total work across workers.
+            'makespan_lower_bound_tokens': max(
+                max(costs, default=0), -(-total_cost // self.concurrency)
+            ),
+        })
+        if self.debug:
+            print(
+                f"[DEBUG] スケジュール: 優先 {prioritized} / 全 {len(batches)} バッチ、"
+                f"推定コスト {total_cost} トークン",
+                file=sys.stderr,
+            )
+        return order
+
+    def _print_batch_progress(
+        self,
+        batch_idx: int,
+        batch: List[Path],
+        total_batches: int,
+        processed_files: int,
+        total_files: int,
+    ) -> None:
+        batch_progress = (batch_idx / max(total_batches, 1)) * 100
+        file_progress = (processed_files / max(total_files, 1)) * 100
+
+        with self._progress_lock:
             if len(batch) == 1:
                 print(
                     f"\n[{processed_files + 1}/{total_files} ({file_progress:.1f}%)] レビュー中: {batch[0].relative_to(self.code_dir)}"
@@ -829,19 +2344,13 @@ The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix i
                 for f in batch:
                     print(f"  - {f.relative_to(self.code_dir)}")
 
-            self.review_batch(batch, repo_overview_entries=repo_overview_entries)
-            processed_files += len(batch)
-
-        updated_state: ReviewerState = dict(state)
-        updated_state.update({'processed_files': processed_files, 'results': self.results})
-        return updated_state
-
     def _finalize_node(self, state: ReviewerState) -> ReviewerState:
         total_files = state.get('total_files', 0)
+        duplicate_files = state.get('duplicate_files', 0)
         total_batches = state.get('total_batches', 0)
 
         output = {
-            'total_files': total_files,
+            'total_files': total_files + duplicate_files,
             'files_with_issues': len(self.results),
             'results': self.results,
         }
@@ -851,6 +2360,8 @@ The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix i
 
         print(f"\n✓ レビュー完了。結果を保存しました: {self.output_path}")
         print(f"  レビューしたファイル数: {total_files}")
+        if duplicate_files:
+            print(f"  内容が重複するファイル数: {duplicate_files} (代表ファイルの結果を共有)")
         print(f"  バッチ数: {total_batches}")
         print(f"  問題が見つかったファイル数: {len(self.results)}")
 
@@ -858,6 +2369,93 @@ The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix i
         print(
             f"  カバレッジ: {report['covered_segments']}/{report['total_segments']} セグメント"
         )
+        if self.cache is not None:
+            cache_stats = self.cache.stats()
+            print(f"  LLMキャッシュ: ヒット {cache_stats['hits']} / ミス {cache_stats['misses']}")
+        if len(self.api_urls) > 1:
+            for endpoint in self.client.pool.summary():
+                print(
+                    f"  エンドポイント {endpoint['url']}: 成功 {endpoint['served']} / 失敗 {endpoint['failures']}"
+                )
+
+        if self.concurrency_limiter is not None:
+            concurrency = self.concurrency_limiter.snapshot()
+            print(
+                f"  並列度: 最終 {concurrency['final_limit']} / 最大 {concurrency['peak_limit']} "
+                f"(範囲 {concurrency['min_limit']}-{concurrency['max_limit']})"
+            )
+        else:
+            concurrency = {'mode': 'fixed', 'final_limit': self.concurrency}
+        self.metrics.update('concurrency', concurrency)
+        with self._prompt_usage_lock:
+            prompt_cache: Dict[str, Any] = {'layout': self.prompt_layout, **self._prompt_usage}
+        # Servers that do not report cached_tokens leave the hit rate unknown rather than zero.
+        prompt_cache['hit_rate'] = (
+            round(prompt_cache['cached_tokens'] / prompt_cache['prompt_tokens'], 4)
+            if prompt_cache['reported'] and prompt_cache['prompt_tokens']
+            else None
+        )
+        if prompt_cache['hit_rate'] is not None:
+            print(
+                f"  プレフィックスキャッシュ: {prompt_cache['cached_tokens']}/{prompt_cache['prompt_tokens']} "
+                f"プロンプトトークン ({prompt_cache['hit_rate']:.1%})"
+            )
+        self.metrics.update('prompt_cache', prompt_cache)
+        with self._parse_stats_lock:
+            parse_stats = {
+                model: {
+                    **stats,
+                    'failure_rate': round(stats['parse_failures'] / stats['responses'], 4)
+                    if stats['responses'] else None,
+                }
+                for model, stats in self._parse_stats.items()
+            }
+            structured = {
+                'requested': self.structured_output,
+                'active': self.structured_output and self._structured_output_rejected is None,
+                'rejected': self._structured_output_rejected,
+            }
+        for model, stats in parse_stats.items():
+            if stats['parse_failures'] or stats['recovered']:
+                print(
+                    f"  JSON解析失敗: {stats['parse_failures']}/{stats['responses']} 応答、"
+                    f"修復 {stats['recovered']} ({model})"
+                )
+        self.metrics.update('parse', {'structured_output': structured, 'models': parse_stats})
+        if self.time_budget is not None:
+            budget = self.time_budget.snapshot()
+            budget['unreviewed_segments'] = sum(
+                1 for item in report['missed'] if item.get('reason') == 'time_budget'
+            )
+            if budget['unreviewed_segments']:
+                print(
+                    f"  時間予算: {budget['budget_s']:.0f}秒に達したため "
+                    f"{budget['unreviewed_segments']} セグメントを未レビューのまま終了しました"
+                )
+            self.metrics.update('time_budget', budget)
+        self.token_calibration.save()
+        self.metrics.update('token_calibration', {
+            'used': self.token_ratios,
+            'next_run': self.token_calibration.ratios(),
+        })
+        if self.rate_limiter.enabled:
+            rate_limit = self.rate_limiter.snapshot()
+            print(
+                f"  レート制限: {rate_limit['requests']} リクエスト / {rate_limit['tokens']} トークン、"
+                f"待機 {rate_limit['wait_s']:.1f}秒"
+            )
+            self.metrics.update('rate_limit', rate_limit)
+        if self.hedge_policy is not None:
+            hedging = self.hedge_policy.snapshot()
+            if hedging['hedged']:
+                print(
+                    f"  ヘッジリクエスト: {hedging['hedged']} 件 "
+                    f"(別エンドポイントが先に応答: {hedging['hedge_wins']} 件)"
+                )
+            self.metrics.update('hedging', hedging)
+        self.metrics.update('endpoints', self.client.pool.summary())
+        self.metrics.write()
+
         if report['missed_segments'] > 0:
             print("  未レビューセグメントが残っています。詳細: coverage/report.md", file=sys.stderr)
             if self.fail_on_miss:
@@ -867,7 +2465,82 @@ The `risk_score` must be an integer between 1 (safe to defer) and 10 (must fix i
 
     def run(self):
         graph = self.build_graph()
-        return graph.invoke({})
+        started = time.monotonic()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
+        try:
+            state = graph.invoke({})
+        finally:
+            self.client.close()
+            if self.metrics_exporter is not None:
+                self._finished = True
+                self.metrics_exporter.stop()
+            if self.tracer.enabled:
+                trace_path = self.coverage.coverage_dir / "trace.json"
+                self.tracer.write(trace_path)
+                print(f"  トレース: {trace_path} (chrome://tracing または https://ui.perfetto.dev で表示)")
+            # Also when finalize exits early (--fail-on-miss): those are the runs worth profiling.
+            if self.profiler is not None:
+                self._report_profile()
+            self._report_timing(time.monotonic() - started)
+        return state
+
+    def _report_profile(self) -> None:
+        summary_path = self.coverage.coverage_dir / "profile-summary.txt"
+        totals = self.profiler.write(summary_path)
+        print(f"  プロファイル: {self.profiler.output_dir}/<ステージ>.prof, 上位関数: {summary_path}")
+        for name, stage in totals.items():
+            print(
+                f"    {name}: 経過 {stage['wall_s']:.1f}秒 / CPU {stage['cpu_s']:.1f}秒 / "
+                f"LLM待ち {stage['llm_wait_s']:.1f}秒"
+            )
+        self.metrics.update('profile', totals)
+
+    def _report_timing(self, wall_seconds: float) -> None:
+        """Print where the run spent its time and add it to ``coverage/metrics.json``."""
+
+        requests_timing = self.request_timings.snapshot()
+        timing = {
+            'wall_s': round(wall_seconds, 3),
+            'nodes': {name: round(seconds, 3) for name, seconds in self.node_timings.items()},
+            'requests': requests_timing,
+        }
+        print("  処理時間の内訳:")
+        for name, seconds in timing['nodes'].items():
+            share = seconds / wall_seconds if wall_seconds > 0 else 0.0
+            print(f"    {name:<20} {seconds:>9.1f}秒 ({share:.0%})")
+        call = requests_timing.get('call', {})
+        if call.get('count'):
+            print(f"  LLMリクエスト {call['count']} 件 (p50 / p90 / p99 / 合計):")
+            labels = {
+                'queue': '送信待ち', 'connect': '接続', 'ttft': 'TTFT',
+                'generation': '生成', 'http': 'HTTP', 'call': '全体',
+            }
+            for phase in REQUEST_TIMING_PHASES:
+                stats = requests_timing.get(phase)
+                if not stats or not stats.get('count'):
+                    continue
+                print(
+                    f"    {labels[phase]}: {stats['p50_ms'] / 1000:.2f}秒 / {stats['p90_ms'] / 1000:.2f}秒 / "
+                    f"{stats['p99_ms'] / 1000:.2f}秒 / {stats['total_ms'] / 1000:.1f}秒"
+                )
+        self.metrics.update('timing', timing)
+        self.metrics.write()
+
+
+def parse_duration(text: str) -> float:
+    """Parse durations such as ``45m``, ``1h30m``, ``90s`` or plain seconds."""
+
+    value = text.strip().lower()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    match = re.fullmatch(r'(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)s)?', value)
+    if not value or not match:
+        raise argparse.ArgumentTypeError(f"時間の形式が不正です: {text} (例: 45m, 1h30m, 90s)")
+    hours, minutes, seconds = (float(part) if part else 0.0 for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
 
 
 def main():
@@ -876,8 +2549,9 @@ def main():
     )
     parser.add_argument(
         '--api-url',
-        default='http://192.168.50.136:1234/v1',
-        help='LLM APIのベースURL (デフォルト: http://192.168.50.136:1234/v1)'
+        action='append',
+        default=[],
+        help='LLM APIのベースURL。複数指定すると同じモデルを動かすサーバー間で負荷分散 (デフォルト: http://192.168.50.136:1234/v1)'
     )
     parser.add_argument(
         '--model',
@@ -959,8 +2633,193 @@ def main():
         action='store_true',
         help='未レビューのセグメントが存在する場合に非ゼロ終了コードで停止する'
     )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=1,
+        help='同時に実行するレビューリクエストの最大数。LLMサーバーの並列スロット数に合わせて指定 (デフォルト: 1)'
+    )
+    parser.add_argument(
+        '--http-pool-size',
+        type=int,
+        help='LLM APIホストごとに保持するHTTP接続の上限（キープアライブで再利用） (デフォルト: --concurrency と同じ)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='LLM応答キャッシュの保存先ディレクトリ (デフォルト: <code-dir>/.llm-cache)'
+    )
+    parser.add_argument(
+        '--cache-max-mb',
+        type=int,
+        default=512,
+        help='LLM応答キャッシュの最大サイズ（MB）。超過分は最も古く使われたものから削除 (デフォルト: 512)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='LLM応答キャッシュを無効化する'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='コミットをまたいで内容が同一のチャンクは前回の指摘を再利用し、LLM呼び出しを省略する'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='ストリーミング(SSE)で応答を受信し、JSONでない出力を早期に打ち切る。TTFTとトークン/秒をLedgerに記録'
+    )
+    parser.add_argument(
+        '--max-completion-tokens',
+        type=int,
+        default=4096,
+        help='1リクエストあたりの max_tokens の上限。実際の値はコンテキスト長の残りから自動調整 (デフォルト: 4096)'
+    )
+    parser.add_argument(
+        '--max-continuations',
+        type=int,
+        default=2,
+        help='応答が max_tokens で切れた場合に続きを要求する最大回数 (デフォルト: 2)'
+    )
+    parser.add_argument(
+        '--max-retries',
+        type=int,
+        default=3,
+        help='タイムアウトや429/5xxなど一時的なエラー時の最大再試行回数 (デフォルト: 3)'
+    )
+    parser.add_argument(
+        '--retry-backoff',
+        type=float,
+        default=2.0,
+        help='再試行の初回待機時間の基準（秒）。試行ごとに倍増し、ジッターを加える (デフォルト: 2.0)'
+    )
+    parser.add_argument(
+        '--retry-backoff-max',
+        type=float,
+        default=60.0,
+        help='再試行の待機時間の上限（秒） (デフォルト: 60)'
+    )
+    parser.add_argument(
+        '--circuit-breaker-threshold',
+        type=int,
+        default=5,
+        help='連続してこの回数だけ一時的なエラーが起きたらリクエスト送信を一時停止する。0で無効 (デフォルト: 5)'
+    )
+    parser.add_argument(
+        '--circuit-breaker-cooldown',
+        type=float,
+        default=30.0,
+        help='サーキットブレーカー作動時にリクエストを停止する時間（秒） (デフォルト: 30)'
+    )
+    parser.add_argument(
+        '--endpoint-eject-after',
+        type=int,
+        default=3,
+        help='複数の --api-url 指定時、連続してこの回数だけ一時的なエラーが起きたエンドポイントを除外 (デフォルト: 3)'
+    )
+    parser.add_argument(
+        '--health-check-interval',
+        type=float,
+        default=30.0,
+        help='複数の --api-url 指定時のヘルスチェック間隔（秒）。除外したエンドポイントは成功時に復帰。0で無効 (デフォルト: 30)'
+    )
+    parser.add_argument(
+        '--adaptive-concurrency',
+        action='store_true',
+        help='レイテンシや429/503・タイムアウトに応じて同時リクエスト数を自動調整（AIMD）。上限は --concurrency'
+    )
+    parser.add_argument(
+        '--min-concurrency',
+        type=int,
+        default=1,
+        help='--adaptive-concurrency 使用時の同時リクエスト数の下限 (デフォルト: 1)'
+    )
+    parser.add_argument(
+        '--max-tokens-per-minute',
+        type=int,
+        default=0,
+        help='1分あたりにLLMサーバーへ送るトークン数（プロンプト＋生成）の上限。共有サーバーで使用。0で無制限 (デフォルト: 0)'
+    )
+    parser.add_argument(
+        '--max-requests-per-minute',
+        type=int,
+        default=0,
+        help='1分あたりのLLMリクエスト数の上限。0で無制限 (デフォルト: 0)'
+    )
+    parser.add_argument(
+        '--hedge-percentile',
+        type=float,
+        default=0.0,
+        help='複数の --api-url 指定時、応答時間がこのパーセンタイルを超えたリクエストを別エンドポイントにも送り、先に返った応答を採用する。0で無効 (例: 95, デフォルト: 0)'
+    )
+    parser.add_argument(
+        '--hedge-min-samples',
+        type=int,
+        default=10,
+        help='--hedge-percentile の閾値を計算する前に必要な完了リクエスト数 (デフォルト: 10)'
+    )
+    parser.add_argument(
+        '--prompt-layout',
+        choices=['standard', 'prefix-cache'],
+        default='standard',
+        help='プロンプトの構成。prefix-cache はリポジトリ概要・指示・JSON形式を共通の先頭部分にまとめ、コードを末尾に置いてサーバーのプレフィックスキャッシュを効かせる (デフォルト: standard)'
+    )
+    
+    parser.add_argument(
+        '--structured-output',
+        action='store_true',
+        help='応答のJSONスキーマを response_format で送信し、サーバー側で出力形式を強制する。サーバーが拒否した場合は通常のプロンプトに自動で戻す'
+    )
+    parser.add_argument(
+        '--metrics-textfile',
+        help='進捗・トークン数・エラー数などを Prometheus テキスト形式で定期的に書き出すファイル（node-exporter の textfile collector 用、例: /var/lib/node_exporter/textfile/llm_reviewer.prom）'
+    )
+    parser.add_argument(
+        '--metrics-interval',
+        type=float,
+        default=15.0,
+        help='--metrics-textfile の書き出し間隔（秒） (デフォルト: 15)'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='LangGraphの各ノードを cProfile で計測し、coverage/profile/<ノード>.prof と上位関数の一覧 coverage/profile-summary.txt を出力する'
+    )
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=30,
+        help='--profile の一覧に表示する関数の数 (デフォルト: 30)'
+    )
+    parser.add_argument(
+        '--trace',
+        action='store_true',
+        help='ノード・バッチ・LLMリクエスト・Ledger書き込みのタイムラインを coverage/trace.json (Chrome trace 形式) に出力する'
+    )
+    parser.add_argument(
+        '--no-dedupe',
+        action='store_true',
+        help='内容が同一のファイルも個別にレビューする（デフォルトでは1つだけレビューし、結果を他のパスにも適用）'
+    )
+    parser.add_argument(
+        '--no-bisect',
+        action='store_true',
+        help='タイムアウトやJSON解析失敗時にバッチ・チャンクを分割して再レビューする処理を無効化する'
+    )
+    parser.add_argument(
+        '--time-budget',
+        type=parse_duration,
+        help='実行時間の上限（例: 45m, 1h30m, 90s）。終了見込みが上限を超えるリクエストは開始せず、実行中の分を待って結果とカバレッジレポートを出力'
+    )
+    parser.add_argument(
+        '--priority-file',
+        help='先にレビューするパスを1行に1つ記載したファイル（globパターン・ディレクトリ可、#以降はコメント）'
+    )
     
     args = parser.parse_args()
+
+    if not args.api_url:
+        args.api_url = ['http://192.168.50.136:1234/v1']
     
     if not args.exclude:
         args.exclude = [
@@ -985,6 +2844,18 @@ def main():
         except Exception as e:
             print(f"プロンプトファイルの読み込みエラー: {e}", file=sys.stderr)
             sys.exit(1)
+
+    priority_patterns = []
+    if args.priority_file:
+        try:
+            with open(args.priority_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.split('#', 1)[0].strip()
+                    if line:
+                        priority_patterns.append(line)
+        except Exception as e:
+            print(f"優先リストファイルの読み込みエラー: {e}", file=sys.stderr)
+            sys.exit(1)
     
     reviewer = CodeReviewer(
         api_url=args.api_url,
@@ -1002,6 +2873,39 @@ def main():
         repo_overview_tokens=args.repo_overview_tokens,
         repo_overview_lines=args.repo_overview_lines,
         fail_on_miss=args.fail_on_miss,
+        concurrency=args.concurrency,
+        http_pool_size=args.http_pool_size,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        use_cache=not args.no_cache,
+        incremental=args.incremental,
+        stream=args.stream,
+        max_completion_tokens=args.max_completion_tokens,
+        max_continuations=args.max_continuations,
+        max_retries=args.max_retries,
+        retry_backoff=args.retry_backoff,
+        retry_backoff_max=args.retry_backoff_max,
+        circuit_breaker_threshold=args.circuit_breaker_threshold,
+        circuit_breaker_cooldown=args.circuit_breaker_cooldown,
+        endpoint_eject_after=args.endpoint_eject_after,
+        health_check_interval=args.health_check_interval,
+        adaptive_concurrency=args.adaptive_concurrency,
+        min_concurrency=args.min_concurrency,
+        max_tokens_per_minute=args.max_tokens_per_minute,
+        max_requests_per_minute=args.max_requests_per_minute,
+        prompt_layout=args.prompt_layout,
+        priority_patterns=priority_patterns,
+        time_budget=args.time_budget,
+        structured_output=args.structured_output,
+        bisect_failures=not args.no_bisect,
+        hedge_percentile=args.hedge_percentile,
+        hedge_min_samples=args.hedge_min_samples,
+        dedupe=not args.no_dedupe,
+        metrics_textfile=args.metrics_textfile,
+        metrics_interval=args.metrics_interval,
+        profile=args.profile,
+        profile_top=args.profile_top,
+        trace=args.trace,
     )
     
     reviewer.run()
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from flow_control import AdaptiveConcurrencyLimiter, DeadlineExceeded, TokenBucketRateLimiter
+from llm_client import CircuitBreaker
+
+
+def test_rate_limit_wait_stops_at_the_deadline():
+    limiter = TokenBucketRateLimiter(requests_per_minute=1)
+    limiter.acquire(10)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        limiter.acquire(10, deadline=time.monotonic() + 0.2)
+    assert time.monotonic() - started < 0.1  # the next token is a minute away; no point waiting
+    assert limiter.requests == 1
+
+
+def test_rate_limit_try_acquire_never_waits():
+    limiter = TokenBucketRateLimiter(tokens_per_minute=100)
+    assert limiter.try_acquire(80)
+    assert not limiter.try_acquire(80)
+
+
+def test_concurrency_wait_stops_at_the_deadline():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=1)
+    limiter.acquire()
+    with pytest.raises(DeadlineExceeded):
+        limiter.acquire(deadline=time.monotonic() + 0.05)
+    assert limiter.in_flight == 1
+
+
+def test_open_breaker_refuses_a_deadline_before_the_cooldown():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+    breaker.record_failure()
+    with pytest.raises(DeadlineExceeded):
+        breaker.before_request(deadline=time.monotonic() + 1)
+
+
+def test_abandoned_trial_lets_the_next_request_through():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_request()  # this thread holds the half-open trial
+    breaker.abandon()
+    waiter = threading.Thread(target=breaker.before_request)
+    waiter.start()
+    waiter.join(timeout=1)
+    assert not waiter.is_alive()
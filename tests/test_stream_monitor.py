@@ -0,0 +1,80 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from json_recovery import recover_json
+from llm_client import JsonStreamMonitor, LLMClient
+
+PROSE_WRAPPED = (
+    "Here is the review of both files:\n\n"
+    '{"file": "a.py", "reviews": [{"line": 1, "severity": "info", "risk_score": 2, "message": "a"}]}\n'
+    '{"file": "b.py", "reviews": [{"line": 3, "severity": "error", "risk_score": 9, "message": "b"}]}\n'
+    "Let me know if you need anything else."
+)
+
+
+def feed_all(monitor, text, step=7):
+    return [monitor.feed(text[i:i + step]) for i in range(0, len(text), step)]
+
+
+def test_prose_around_json_is_not_aborted():
+    assert set(feed_all(JsonStreamMonitor(), PROSE_WRAPPED)) == {'ok'}
+
+
+def test_fenced_json_is_accepted():
+    assert set(feed_all(JsonStreamMonitor(), '```json\n{"reviews": []}\n```')) == {'ok'}
+
+
+def test_prose_without_json_is_aborted():
+    assert 'invalid' in feed_all(JsonStreamMonitor(max_lead_chars=50), "I cannot review this code. " * 5)
+
+
+def test_long_trailing_prose_is_cut_off():
+    verdicts = feed_all(JsonStreamMonitor(max_trailing_chars=20), '{"reviews": []} ' + "more words " * 10)
+    assert verdicts[-1] == 'trailing'
+
+
+@pytest.fixture
+def streaming_server():
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for i in range(0, len(PROSE_WRAPPED), 10):
+                event = {'choices': [{'delta': {'content': PROSE_WRAPPED[i:i + 10]}, 'finish_reason': None}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            done = {'choices': [{'delta': {}, 'finish_reason': 'stop'}]}
+            self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_streamed_answer_wrapped_in_prose_reaches_recovery(streaming_server):
+    client = LLMClient(api_urls=[streaming_server])
+    try:
+        result = client.stream_chat_completion(
+            {'model': 'test', 'messages': [{'role': 'user', 'content': 'review'}]},
+            timeout=5,
+            endpoint=client.pool.endpoints[0],
+            monitor=JsonStreamMonitor(),
+        )
+    finally:
+        client.close()
+
+    assert result.aborted is None
+    assert result.content == PROSE_WRAPPED
+    recovered = recover_json(result.content)
+    assert recovered is not None
+    assert [item['file'] for item in recovered.value] == ['a.py', 'b.py']
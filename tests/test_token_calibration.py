@@ -0,0 +1,35 @@
+from token_calibration import TokenCalibration
+
+
+def observe(calibration, chars, tokens):
+    calibration.observe(
+        language='ja',
+        prompt_chars=chars,
+        prompt_tokens=tokens,
+        code_chars={'.cpp': chars},
+        completion_chars=0,
+        completion_tokens=0,
+    )
+
+
+def test_ratios_are_published_in_steps(tmp_path):
+    calibration = TokenCalibration(tmp_path / 'calibration.json')
+    observe(calibration, 3_300, 1_000)
+    assert calibration.ratios() == {'.cpp': 3.0}
+
+
+def test_small_drift_keeps_the_published_ratio(tmp_path):
+    path = tmp_path / 'calibration.json'
+    calibration = TokenCalibration(path)
+    observe(calibration, 3_300, 1_000)
+    calibration.save()
+
+    calibration = TokenCalibration(path)
+    observe(calibration, 3_800, 1_000)  # 3.55 overall, still within a step of 3.0
+    calibration.save()
+    assert TokenCalibration(path).ratios() == {'.cpp': 3.0}
+
+    calibration = TokenCalibration(path)
+    observe(calibration, 20_000, 4_000)  # 4.52 overall
+    calibration.save()
+    assert TokenCalibration(path).ratios() == {'.cpp': 4.5}
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Mapping
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+MIN_CHARS_PER_TOKEN = 1.0
+MAX_CHARS_PER_TOKEN = 8.0
+RATIO_STEP = 0.5  # Published ratios move in steps of this many chars per token
+
+
+@dataclass
+class TokenCalibration:
+    """Chars-per-token ratios learned from the ``usage`` the LLM server reports.
+
+    Ratios are kept per file extension (``.py``, ``.cpp``, ...) for code and per output
+    language (``text:ja``, ``text:en``) for prompt instructions and model answers. Totals
+    are decayed once they exceed ``max_tokens`` so the ratios follow model or tokenizer
+    changes instead of freezing on the first runs.
+
+    The ratios handed out shape prompts (batches, chunks, overview), so they are published
+    in ``RATIO_STEP`` steps and only move once the measured ratio is half a step outside
+    the current one. Small drift between runs keeps prompts, and so the response cache and
+    ``--incremental`` reuse, unchanged.
+    """
+
+    path: Path
+    min_tokens: int = 500
+    max_tokens: int = 500_000
+    _entries: Dict[str, Dict[str, float]] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.path = Path(self.path)
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with self.path.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return
+        entries = data.get("entries") if isinstance(data, dict) else None
+        if not isinstance(entries, dict):
+            return
+        for key, entry in entries.items():
+            try:
+                chars = float(entry["chars"])
+                tokens = float(entry["tokens"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if chars > 0 and tokens > 0:
+                self._entries[key] = {
+                    "chars": chars,
+                    "tokens": tokens,
+                    "samples": int(entry.get("samples", 0)),
+                }
+                published = entry.get("published")
+                if isinstance(published, (int, float)) and published > 0:
+                    self._entries[key]["published"] = float(published)
+
+    def ratios(self) -> Dict[str, float]:
+        """Return the calibrated ratios that have seen enough tokens to be trusted."""
+
+        with self._lock:
+            return {
+                key: self._published(entry)
+                for key, entry in self._entries.items()
+                if entry["tokens"] >= self.min_tokens
+            }
+
+    @staticmethod
+    def _ratio(entry: Mapping[str, float]) -> float:
+        ratio = entry["chars"] / entry["tokens"]
+        return round(min(MAX_CHARS_PER_TOKEN, max(MIN_CHARS_PER_TOKEN, ratio)), 2)
+
+    @classmethod
+    def _published(cls, entry: Mapping[str, float]) -> float:
+        ratio = cls._ratio(entry)
+        published = entry.get("published")
+        # Hysteresis: keep the current step until the ratio is half a step outside of it.
+        if published is not None and published - RATIO_STEP / 2 < ratio < published + 1.5 * RATIO_STEP:
+            return published
+        # Round down: overestimating tokens only under-fills a batch, the reverse overflows.
+        return max(MIN_CHARS_PER_TOKEN, math.floor(ratio / RATIO_STEP) * RATIO_STEP)
+
+    def _add_locked(self, key: str, chars: float, tokens: float) -> None:
+        if chars <= 0 or tokens <= 0:
+            return
+        entry = self._entries.setdefault(key, {"chars": 0.0, "tokens": 0.0, "samples": 0})
+        entry["chars"] += chars
+        entry["tokens"] += tokens
+        entry["samples"] += 1
+        if entry["tokens"] > self.max_tokens:
+            scale = self.max_tokens / entry["tokens"]
+            entry["chars"] *= scale
+            entry["tokens"] *= scale
+
+    def _text_ratio_locked(self, language: str) -> float:
+        # Even a single answer beats the default when splitting a prompt into text and code.
+        entry = self._entries.get(f"text:{language}")
+        return self._ratio(entry) if entry else DEFAULT_CHARS_PER_TOKEN
+
+    def observe(
+        self,
+        *,
+        language: str,
+        prompt_chars: int,
+        prompt_tokens: int,
+        code_chars: Mapping[str, int],
+        completion_chars: int,
+        completion_tokens: int,
+    ) -> None:
+        """Learn from one request/response pair.
+
+        The completion is plain text in the review language and calibrates ``text:<lang>``.
+        Prompt tokens left after subtracting the non-code text are attributed to the code,
+        but only when the prompt is mostly code of a single extension.
+        """
+
+        with self._lock:
+            self._add_locked(f"text:{language}", completion_chars, completion_tokens)
+            code = {suffix: chars for suffix, chars in code_chars.items() if suffix and chars > 0}
+            if len(code) != 1:
+                return
+            (suffix, chars), = code.items()
+            other_chars = max(0, prompt_chars - chars)
+            code_tokens = prompt_tokens - other_chars / self._text_ratio_locked(language)
+            if code_tokens < 0.5 * prompt_tokens:
+                return
+            self._add_locked(suffix, chars, code_tokens)
+
+    def save(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                if entry["tokens"] >= self.min_tokens:
+                    entry["published"] = self._published(entry)
+            payload = {
+                "default_chars_per_token": DEFAULT_CHARS_PER_TOKEN,
+                "updated": datetime.now(timezone.utc).isoformat(),
+                "entries": {
+                    key: {
+                        "chars": round(entry["chars"], 1),
+                        "tokens": round(entry["tokens"], 1),
+                        "samples": entry["samples"],
+                        "chars_per_token": self._ratio(entry),
+                        **({"published": entry["published"]} if "published" in entry else {}),
+                    }
+                    for key, entry in sorted(self._entries.items())
+                },
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+
+@dataclass
+class TraceRecorder:
+    """Collects spans as Chrome trace events, viewable in chrome://tracing or Perfetto.
+
+    Spans are complete (``X``) events on the thread that ran them. Tags set with ``tags()``
+    are attached to every span the thread opens inside that block, so a request inherits
+    the batch it belongs to. ``adjust()`` records counter (``C``) events, e.g. requests in
+    flight per endpoint. A disabled recorder only yields, so call sites need no checks.
+    """
+
+    enabled: bool = False
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    _origin: float = field(default_factory=time.perf_counter, init=False, repr=False)
+    _counters: Dict[str, Dict[str, int]] = field(default_factory=dict, init=False, repr=False)
+    _thread_names: Dict[int, str] = field(default_factory=dict, init=False, repr=False)
+    _local: threading.local = field(default_factory=threading.local, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def _now_us(self) -> float:
+        return round((time.perf_counter() - self._origin) * 1_000_000, 1)
+
+    def current_tags(self) -> Dict[str, Any]:
+        return dict(getattr(self._local, 'tags', {}))
+
+    @contextlib.contextmanager
+    def tags(self, **tags: Any) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        previous = getattr(self._local, 'tags', {})
+        self._local.tags = {**previous, **tags}
+        try:
+            yield
+        finally:
+            self._local.tags = previous
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """Record ``name`` around the block; the yielded dict can take more args, e.g. a status."""
+
+        if not self.enabled:
+            yield args
+            return
+        args = {**self.current_tags(), **args}
+        started = self._now_us()
+        try:
+            yield args
+        finally:
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': started,
+                'dur': round(self._now_us() - started, 1),
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': {key: value for key, value in args.items() if value is not None},
+            }
+            with self._lock:
+                self._thread_names.setdefault(event['tid'], threading.current_thread().name)
+                self.events.append(event)
+
+    def adjust(self, name: str, series: str, delta: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            values = self._counters.setdefault(name, {})
+            values[series] = values.get(series, 0) + delta
+            self.events.append({
+                'name': name,
+                'ph': 'C',
+                'ts': self._now_us(),
+                'pid': os.getpid(),
+                'args': dict(values),
+            })
+
+    def write(self, path: Path) -> None:
+        with self._lock:
+            metadata = [
+                {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': thread_name}}
+                for tid, thread_name in self._thread_names.items()
+            ]
+            events = metadata + sorted(self.events, key=lambda event: event['ts'])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w', encoding='utf-8') as handle:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, handle, ensure_ascii=False)